@@ -13,7 +13,7 @@ import json
 import os
 import sys
 from pathlib import Path
-from Rotation.utils import get_database_location
+from Rotation.utils import READONLY_DATABASE, get_database_location, get_readonly_database_name
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -87,10 +87,18 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / get_database_location(),
-        }
+        },
+        # Same file opened with mode=ro and PRAGMA query_only; used for reads
+        # by Rotation.routers.ReadWriteRouter.
+        READONLY_DATABASE: {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': get_readonly_database_name(BASE_DIR / get_database_location()),
+        },
     }
     print("Using file database")
 
+DATABASE_ROUTERS = ['Rotation.routers.ReadWriteRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -1,3 +1,29 @@
 from django.contrib import admin
+from .models import Tech, TechAssignment, Unavailability
 
-# Register your models here.
+class UnavailabilityInline(admin.TabularInline):
+    model = Unavailability
+    extra = 0
+
+@admin.register(Tech)
+class TechAdmin(admin.ModelAdmin):
+    inlines = [UnavailabilityInline]
+    list_display = ['name', 'active']
+    list_filter = ['active']
+    search_fields = ['name']
+    ordering = ['name_normalized']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Word-prefix search on the indexed name tokens instead of the default
+        # icontains, which scans the whole table.
+        if not search_term:
+            return queryset, False
+        return Tech.search(search_term, queryset), False
+
+@admin.register(TechAssignment)
+class TechAssignmentAdmin(admin.ModelAdmin):
+    list_display = ['tech', 'assigned_at', 'is_current']
+    list_select_related = ['tech']
+    list_filter = ['is_current']
+    date_hierarchy = 'assigned_at'
+    raw_id_fields = ['tech']
@@ -1,6 +1,7 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
 from django.db.backends.signals import connection_created
-from django.conf import settings
+from django.db.models.signals import pre_delete
 import sys
 
 class RotationConfig(AppConfig):
@@ -8,13 +9,17 @@ class RotationConfig(AppConfig):
     name = 'Rotation'
 
     def ready(self):
-        from .utils import get_database_location
-        from django.db import connections
+        from .models import Tech, forget_archived_assignments
+        from .utils import configure_sqlite_connection, sync_database_connection
+
+        connection_created.connect(configure_sqlite_connection, dispatch_uid='rotation_configure_sqlite_connection')
+        # Deleting a tech removes its archived history along with its assignments;
+        # pre_delete, while its ArchivedTechDay rows still say which days to rewrite.
+        pre_delete.connect(forget_archived_assignments, sender=Tech, dispatch_uid='rotation_forget_archived_assignments')
 
         if 'test' in sys.argv or 'test_coverage' in sys.argv:
             return
 
-        def update_db_connection(sender, connection, **kwargs):
-            connection.settings_dict['NAME'] = str(settings.BASE_DIR / get_database_location())
-
-        connection_created.connect(update_db_connection)
+        # Re-read config.json before each request opens a connection so a
+        # relocation made by any worker (or relocate_db) is picked up by all.
+        request_started.connect(sync_database_connection, dispatch_uid='rotation_sync_database_connection')
@@ -1 +1,13 @@
 ASSIGNMENT_HISTORY_LIMIT = 100 
+
+# Rows fetched per round trip when streaming the assignment history export.
+EXPORT_CHUNK_SIZE = 2000
+
+# Most matches returned per typeahead request.
+SEARCH_RESULT_LIMIT = 10
+
+# Techs shown per page on the roster lists (main page and Manage Techs).
+ROSTER_PAGE_SIZE = 50
+
+# Longest single unavailability range, in days.
+MAX_UNAVAILABILITY_DAYS = 366
@@ -0,0 +1,66 @@
+import csv
+import heapq
+import json
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from .constants import EXPORT_CHUNK_SIZE
+from .models import AssignmentArchive, Tech, TechAssignment
+
+EXPORT_FIELDS = ['assigned_at', 'tech_id', 'tech_name', 'is_current']
+
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+def _hot_rows(start_at, end_at):
+    assignments = TechAssignment.objects.all()
+    if start_at:
+        assignments = assignments.filter(assigned_at__gte=start_at)
+    if end_at:
+        assignments = assignments.filter(assigned_at__lt=end_at)
+    return assignments.order_by('assigned_at', 'pk').values_list(
+        'assigned_at', 'tech_id', 'tech__name', 'is_current'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+def _archived_rows(start_at, end_at):
+    archives = AssignmentArchive.objects.all()
+    # Days are local dates at archive time; widen by a day in case TIME_ZONE
+    # has changed since, and filter exactly on the decoded timestamps.
+    if start_at:
+        archives = archives.filter(day__gte=timezone.localtime(start_at).date() - timedelta(days=1))
+    if end_at:
+        archives = archives.filter(day__lte=timezone.localtime(end_at).date() + timedelta(days=1))
+    names = dict(Tech.objects.values_list('id', 'name'))
+    for archive in archives.order_by('day').iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        for assigned_at, tech_id in archive.get_entries():
+            if (not start_at or assigned_at >= start_at) and (not end_at or assigned_at < end_at):
+                yield assigned_at, tech_id, names.get(tech_id), False
+
+def iter_assignment_rows(start=None, end=None):
+    """Yield assignment rows oldest first, for ``start``..``end`` inclusive (local dates).
+
+    Hot rows come from one range query on the indexed ``assigned_at``
+    column, archived ones from the per-day rows of AssignmentArchive; both
+    are read in chunks and merged by time, so no queryset cache or model
+    instances for the hot table are built.
+    """
+    start_at = _day_start(start) if start else None
+    end_at = _day_start(end + timedelta(days=1)) if end else None
+    rows = heapq.merge(_archived_rows(start_at, end_at), _hot_rows(start_at, end_at), key=lambda row: row[0])
+    for assigned_at, tech_id, tech_name, is_current in rows:
+        yield timezone.localtime(assigned_at).isoformat(), tech_id, tech_name, is_current
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row))) + '\n'
@@ -1,5 +1,5 @@
 from django import forms
-from .models import Tech, Settings
+from .models import Tech, Settings, Unavailability
 import os
 
 class TechForm(forms.ModelForm):
@@ -7,9 +7,47 @@ class TechForm(forms.ModelForm):
         model = Tech
         fields = ['name', 'active']
 
+class UnavailabilityForm(forms.ModelForm):
+    class Meta:
+        model = Unavailability
+        fields = ['start_date', 'end_date', 'reason']
+        widgets = {
+            'start_date': forms.DateInput(attrs={'type': 'date'}),
+            'end_date': forms.DateInput(attrs={'type': 'date'}),
+        }
+        help_texts = {
+            'end_date': "Last day away (inclusive).",
+        }
+
 class SettingsForm(forms.Form):
     database_location = forms.CharField(
         max_length=255,
         widget=forms.TextInput(attrs={'class': 'form-control'}),
         help_text="Enter the relative path to the database file from the project root."
     )
+    copy_data = forms.BooleanField(
+        required=False,
+        initial=True,
+        help_text="Copy the current database to the new location before switching. Leave unchecked to switch to an existing database file."
+    )
+
+class AssignmentExportForm(forms.Form):
+    FORMAT_CHOICES = [('csv', 'CSV'), ('ndjson', 'NDJSON')]
+
+    start = forms.DateField(required=False, help_text="First day to include (YYYY-MM-DD).")
+    end = forms.DateField(required=False, help_text="Last day to include (YYYY-MM-DD).")
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end and start > end:
+            raise forms.ValidationError("Start date must be on or before the end date.")
+        return cleaned_data
+
+class RosterFilterForm(forms.Form):
+    STATUS_CHOICES = [('', 'All'), ('active', 'Active'), ('inactive', 'Inactive')]
+
+    status = forms.ChoiceField(choices=STATUS_CHOICES, required=False)
+    after = forms.IntegerField(required=False, min_value=0)
+    before = forms.IntegerField(required=False, min_value=1)
@@ -0,0 +1,170 @@
+import asyncio
+import math
+import random
+import re
+import sqlite3
+from collections import defaultdict
+
+# name -> (method, path); 'main' is the dashboard displays poll, the others are dispatcher clicks.
+ENDPOINTS = {
+    'main': ('GET', '/'),
+    'techs': ('GET', '/techs/'),
+    'next': ('POST', '/next/'),
+    'previous': ('POST', '/previous/'),
+}
+
+LOCKED_MARKER = b'database is locked'
+
+class HttpResult:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+def parse_response(raw):
+    head, _, body = raw.partition(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    headers = []
+    for line in header_lines:
+        name, _, value = line.partition(':')
+        headers.append((name.strip().lower(), value.strip()))
+    return HttpResult(int(status_line.split()[1]), headers, body)
+
+async def http_request(host, port, method, path, headers=None, body=b'', timeout=30):
+    """One HTTP/1.1 request on a fresh connection (``Connection: close``)."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {host}:{port}',
+            'Connection: close',
+            f'Content-Length: {len(body)}',
+        ]
+        lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    return parse_response(raw)
+
+def csrf_token_from(result):
+    for name, value in result.headers:
+        if name == 'set-cookie':
+            match = re.match(r'csrftoken=([^;]+)', value)
+            if match:
+                return match.group(1)
+    return None
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(lambda: defaultdict(int))
+        self.dropped = 0
+
+    def record(self, endpoint, latency, outcome):
+        self.latencies[endpoint].append(latency)
+        self.outcomes[endpoint][outcome] += 1
+
+    def summary(self, elapsed):
+        rows = []
+        for endpoint in sorted(self.latencies):
+            rows.append(self._row(endpoint, self.latencies[endpoint], self.outcomes[endpoint], elapsed))
+        all_latencies = [latency for values in self.latencies.values() for latency in values]
+        totals = defaultdict(int)
+        for outcomes in self.outcomes.values():
+            for outcome, count in outcomes.items():
+                totals[outcome] += count
+        rows.append(self._row('total', all_latencies, totals, elapsed))
+        return rows
+
+    def _row(self, endpoint, latencies, outcomes, elapsed):
+        latencies = sorted(latencies)
+        return {
+            'endpoint': endpoint,
+            'requests': len(latencies),
+            'rps': len(latencies) / elapsed if elapsed else 0.0,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'errors': outcomes.get('error', 0) + outcomes.get('locked', 0),
+            'locked': outcomes.get('locked', 0),
+        }
+
+def classify(result):
+    if result.status >= 500 and LOCKED_MARKER in result.body:
+        return 'locked'
+    if result.status >= 400:
+        return 'error'
+    return 'ok'
+
+async def run_load(host, port, mix, rate, duration, concurrency, timeout=30, seed=None):
+    """Send requests at ``rate`` per second for ``duration`` seconds, open loop.
+
+    Requests are started on a fixed schedule whether or not earlier ones
+    have finished, and latency is measured from the scheduled start, so a
+    slow server shows up as latency instead of silently lowering the rate.
+    If ``concurrency`` requests are already in flight the request is
+    counted as dropped.
+    """
+    stats = LoadStats()
+    token = csrf_token_from(await http_request(host, port, 'GET', '/', timeout=timeout))
+    if token is None:
+        raise RuntimeError('The main page did not set a csrftoken cookie.')
+    post_headers = {
+        'Cookie': f'csrftoken={token}',
+        'X-CSRFToken': token,
+        'Content-Type': 'application/x-www-form-urlencoded',
+    }
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    rng = random.Random(seed)
+    loop = asyncio.get_running_loop()
+    in_flight = asyncio.Semaphore(concurrency)
+    tasks = set()
+
+    async def send(endpoint, scheduled):
+        method, path = ENDPOINTS[endpoint]
+        try:
+            result = await http_request(host, port, method, path,
+                                        post_headers if method == 'POST' else None, timeout=timeout)
+            outcome = classify(result)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            outcome = 'error'
+        finally:
+            in_flight.release()
+        stats.record(endpoint, loop.time() - scheduled, outcome)
+
+    start = loop.time()
+    total = int(rate * duration)
+    for index in range(total):
+        scheduled = start + index / rate
+        await asyncio.sleep(max(0.0, scheduled - loop.time()))
+        if in_flight.locked():
+            stats.dropped += 1
+            continue
+        await in_flight.acquire()
+        task = asyncio.create_task(send(rng.choices(names, weights)[0], scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    return stats, loop.time() - start
+
+def current_assignment_count(database_path):
+    connection = sqlite3.connect(database_path)
+    try:
+        return connection.execute(
+            'SELECT COUNT(*) FROM Rotation_techassignment WHERE is_current'
+        ).fetchone()[0]
+    finally:
+        connection.close()
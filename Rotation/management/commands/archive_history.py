@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from Rotation.constants import ASSIGNMENT_HISTORY_LIMIT
+from Rotation.models import TechAssignment
+from Rotation.routers import use_primary
+
+class Command(BaseCommand):
+    help = 'Compact assignments beyond the hot history into the per-day archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=ASSIGNMENT_HISTORY_LIMIT,
+                            help='Assignments to keep in the hot table (default: %(default)s)')
+
+    def handle(self, *args, **options):
+        if options['keep'] < 1:
+            raise CommandError('--keep must be at least 1')
+        with use_primary():
+            archived = TechAssignment.prune_history(keep=options['keep'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} assignment(s).'))
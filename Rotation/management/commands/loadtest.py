@@ -0,0 +1,124 @@
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from Rotation.loadtest import ENDPOINTS, current_assignment_count, http_request, run_load
+from Rotation.utils import DATABASE_LOCATION_ENV
+
+SEED_TECHS = "from Rotation.models import Tech\nfor i in range({count}):\n    Tech.objects.create(name=f'Load Tech {{i + 1}}')\n"
+
+class Command(BaseCommand):
+    help = ('Start the app on localhost against a scratch SQLite file and drive dashboard polls '
+            'and Next/Previous clicks at it, then report throughput and latency')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=float, default=100, help='Requests started per second (default: %(default)s)')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to send load for (default: %(default)s)')
+        parser.add_argument('--mix', default='main=90,next=8,previous=2',
+                            help=f"Weighted request mix over {', '.join(ENDPOINTS)} (default: %(default)s)")
+        parser.add_argument('--concurrency', type=int, default=200,
+                            help='Most requests in flight; further ones are counted as dropped (default: %(default)s)')
+        parser.add_argument('--techs', type=int, default=10, help='Techs to seed the scratch database with (default: %(default)s)')
+        parser.add_argument('--port', type=int, default=0, help='Port for the app server (default: a free one)')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds (default: %(default)s)')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for the request mix')
+        parser.add_argument('--keep', action='store_true', help='Keep the scratch directory with the database and server log')
+
+    def parse_mix(self, value):
+        mix = {}
+        for part in value.split(','):
+            name, _, weight = part.partition('=')
+            name = name.strip()
+            if name not in ENDPOINTS:
+                raise CommandError(f"Unknown endpoint {name!r} in --mix; expected {', '.join(ENDPOINTS)}")
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f'Weight for {name} in --mix must be a number')
+        if not any(weight > 0 for weight in mix.values()):
+            raise CommandError('--mix needs at least one positive weight')
+        return mix
+
+    def handle(self, *args, **options):
+        mix = self.parse_mix(options['mix'])
+        if options['rate'] <= 0 or options['duration'] <= 0 or options['concurrency'] < 1:
+            raise CommandError('--rate, --duration and --concurrency must be positive')
+
+        host = '127.0.0.1'
+        port = options['port'] or self.free_port(host)
+        scratch = tempfile.mkdtemp(prefix='nextech-loadtest-')
+        database = os.path.join(scratch, 'loadtest.sqlite3')
+        env = {**os.environ, DATABASE_LOCATION_ENV: database}
+        manage = [sys.executable, str(settings.BASE_DIR / 'manage.py')]
+
+        server = None
+        log = open(os.path.join(scratch, 'server.log'), 'w')
+        try:
+            self.stdout.write(f'Preparing scratch database {database}')
+            subprocess.run(manage + ['migrate', '--noinput', '-v0'], env=env, check=True, stdout=log, stderr=log)
+            subprocess.run(manage + ['shell', '-c', SEED_TECHS.format(count=options['techs'])],
+                           env=env, check=True, stdout=log, stderr=log)
+
+            server = subprocess.Popen(manage + ['runserver', '--noreload', f'{host}:{port}'],
+                                      env=env, stdout=log, stderr=log)
+            self.wait_for_server(server, host, port)
+
+            self.stdout.write(f"Sending {options['rate']:g} req/s for {options['duration']:g}s ({options['mix']})")
+            stats, elapsed = asyncio.run(run_load(
+                host, port, mix, options['rate'], options['duration'], options['concurrency'],
+                timeout=options['timeout'], seed=options['seed'],
+            ))
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f'Failed to prepare the scratch database ({e}); see {log.name}')
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+            log.close()
+
+        self.report(stats, elapsed)
+        current = current_assignment_count(database)
+        if options['keep']:
+            self.stdout.write(f'Scratch files kept in {scratch}')
+        else:
+            shutil.rmtree(scratch)
+
+        clicked = any(stats.latencies[name] for name in ('next', 'previous'))
+        if clicked and current != 1:
+            raise CommandError(f'Expected exactly one current TechAssignment, found {current}')
+        self.stdout.write(self.style.SUCCESS(f'Current TechAssignment rows: {current}'))
+
+    def free_port(self, host):
+        with socket.socket() as sock:
+            sock.bind((host, 0))
+            return sock.getsockname()[1]
+
+    def wait_for_server(self, server, host, port, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('The app server exited during startup; rerun with --keep and check server.log')
+            try:
+                asyncio.run(http_request(host, port, 'GET', '/', timeout=2))
+                return
+            except (OSError, asyncio.TimeoutError):
+                time.sleep(0.2)
+        raise CommandError(f'The app server did not answer on {host}:{port} within {timeout}s')
+
+    def report(self, stats, elapsed):
+        def ms(value):
+            return '-' if value is None else f'{value * 1000:.1f}'
+
+        self.stdout.write(f"\n{'endpoint':<10} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                          f"{'p99 ms':>8} {'errors':>7} {'locked':>7}")
+        for row in stats.summary(elapsed):
+            self.stdout.write(f"{row['endpoint']:<10} {row['requests']:>8} {row['rps']:>8.1f} {ms(row['p50']):>8} "
+                              f"{ms(row['p95']):>8} {ms(row['p99']):>8} {row['errors']:>7} {row['locked']:>7}")
+        if stats.dropped:
+            self.stdout.write(self.style.WARNING(f'{stats.dropped} requests dropped at the concurrency limit'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from Rotation.utils import (
+    BACKUP_PAGES_PER_STEP, DatabaseRelocationError, backup_database, get_database_location,
+    get_database_path, relocate_database,
+)
+
+class Command(BaseCommand):
+    help = 'Copy the live database with the SQLite online backup API and switch to the copy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('new_location', type=str, help='Target database file, relative to the project root')
+        parser.add_argument('--snapshot', action='store_true',
+                            help='Only write a verified copy; keep using the current database')
+        parser.add_argument('--pages', type=int, default=BACKUP_PAGES_PER_STEP,
+                            help='Pages copied per backup step (default: %(default)s)')
+        parser.add_argument('--overwrite', action='store_true',
+                            help='Replace the target file if it already exists')
+
+    def handle(self, *args, **options):
+        new_location = options['new_location']
+        if options['pages'] < 1:
+            raise CommandError('--pages must be at least 1')
+
+        def progress(status, remaining, total):
+            if total:
+                self.stdout.write(f'\rCopied {total - remaining}/{total} pages', ending='')
+                self.stdout.flush()
+
+        try:
+            if options['snapshot']:
+                backup_database(get_database_path(), get_database_path(new_location), pages=options['pages'],
+                                progress=progress, overwrite=options['overwrite'])
+            else:
+                relocate_database(new_location, pages=options['pages'], progress=progress,
+                                  overwrite=options['overwrite'])
+        except DatabaseRelocationError as e:
+            self.stdout.write('')
+            raise CommandError(f'Failed to copy database: {e}')
+
+        self.stdout.write('')
+        if options['snapshot']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Snapshot of {get_database_location()} written to {new_location}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Database relocated to {new_location}'))
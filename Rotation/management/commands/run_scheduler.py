@@ -0,0 +1,59 @@
+import time as time_module
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.utils import timezone
+from Rotation.constants import ASSIGNMENT_HISTORY_LIMIT
+from Rotation.models import Tech
+from Rotation.scheduler import FREQUENCIES, WEEKDAYS, Schedule, run_due
+from Rotation.utils import sync_database_connection
+
+class Command(BaseCommand):
+    help = 'Advance the rotation automatically on a schedule, catching up on missed periods'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', choices=FREQUENCIES, default='daily', help='How often to advance (default: daily)')
+        parser.add_argument('--at', default='08:00', help='Local time (TIME_ZONE) to advance at, HH:MM (default: 08:00)')
+        parser.add_argument('--day', choices=WEEKDAYS, default='mon', help='Day of the week for --every weekly (default: mon)')
+        parser.add_argument('--once', action='store_true', help='Catch up on due periods and exit, e.g. when run from cron')
+        parser.add_argument('--max-catch-up', type=int, default=ASSIGNMENT_HISTORY_LIMIT,
+                            help='Most missed periods to record per transaction; longer backlogs are '
+                                 'caught up in several (default: %(default)s)')
+        parser.add_argument('--poll', type=int, default=60,
+                            help='Longest time to sleep between checks, in seconds (default: %(default)s)')
+
+    def handle(self, *args, **options):
+        try:
+            at = datetime.strptime(options['at'], '%H:%M').time()
+        except ValueError:
+            raise CommandError('--at must be in HH:MM format')
+        if options['max_catch_up'] < 1 or options['poll'] < 1:
+            raise CommandError('--max-catch-up and --poll must be at least 1')
+
+        schedule = Schedule(options['every'], at, WEEKDAYS.index(options['day']))
+        self.stdout.write(f'Rotation scheduler running {schedule}')
+
+        while True:
+            sync_database_connection()
+            created = []
+            try:
+                while True:
+                    batch = run_due(schedule, max_catch_up=options['max_catch_up'])
+                    created += batch
+                    if len(batch) < options['max_catch_up']:
+                        break
+            except OperationalError as e:
+                # Another process held the write lock past the busy timeout; retry next poll.
+                self.stderr.write(self.style.WARNING(f'Skipped this check: {e}'))
+            if created:
+                current = Tech.objects.get(pk=created[-1].tech_id)
+                self.stdout.write(self.style.SUCCESS(
+                    f'{current.name} has been assigned as the current tech ({len(created)} period(s) recorded).'))
+
+            if options['once']:
+                break
+
+            connections.close_all()
+            now = timezone.now()
+            wait = (schedule.next_after(now) - now).total_seconds()
+            time_module.sleep(max(1, min(options['poll'], wait)))
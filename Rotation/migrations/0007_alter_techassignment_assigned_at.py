@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:56
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rotation', '0006_alter_settings_options_techassignment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='techassignment',
+            name='assigned_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
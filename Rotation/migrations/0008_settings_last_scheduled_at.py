@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rotation', '0007_alter_techassignment_assigned_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='settings',
+            name='last_scheduled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
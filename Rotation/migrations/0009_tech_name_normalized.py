@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:58
+
+from django.db import migrations, models
+
+
+def fill_name_normalized(apps, schema_editor):
+    Tech = apps.get_model('Rotation', 'Tech')
+    techs = list(Tech.objects.only('id', 'name'))
+    for tech in techs:
+        tech.name_normalized = ' '.join(tech.name.split()).casefold()
+    Tech.objects.bulk_update(techs, ['name_normalized'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rotation', '0008_settings_last_scheduled_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tech',
+            name='name_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_name_normalized, migrations.RunPython.noop),
+    ]
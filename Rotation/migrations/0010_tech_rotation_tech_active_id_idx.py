@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rotation', '0009_tech_name_normalized'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tech',
+            index=models.Index(fields=['active', 'id'], name='rotation_tech_active_id_idx'),
+        ),
+    ]
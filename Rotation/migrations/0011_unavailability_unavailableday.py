@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rotation', '0010_tech_rotation_tech_active_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Unavailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('reason', models.CharField(blank=True, max_length=200)),
+                ('tech', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unavailabilities', to='Rotation.tech')),
+            ],
+            options={
+                'ordering': ['start_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UnavailableDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('tech', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Rotation.tech')),
+                ('unavailability', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='Rotation.unavailability')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'tech'], name='rotation_unavailable_day_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rotation', '0011_unavailability_unavailableday'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssignmentArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('data', models.BinaryField()),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_name_tokens(apps, schema_editor):
+    Tech = apps.get_model('Rotation', 'Tech')
+    TechNameToken = apps.get_model('Rotation', 'TechNameToken')
+    TechNameToken.objects.bulk_create([
+        TechNameToken(tech_id=tech_id, token=token)
+        for tech_id, name in Tech.objects.values_list('id', 'name')
+        for token in sorted(set(' '.join(name.split()).casefold().split()))
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rotation', '0012_assignmentarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TechNameToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100)),
+                ('tech', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='name_tokens', to='Rotation.tech')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'tech'], name='rotation_tech_token_idx')],
+            },
+        ),
+        migrations.RunPython(fill_name_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:21
+
+import json
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_archived_tech_days(apps, schema_editor):
+    AssignmentArchive = apps.get_model('Rotation', 'AssignmentArchive')
+    ArchivedTechDay = apps.get_model('Rotation', 'ArchivedTechDay')
+    Tech = apps.get_model('Rotation', 'Tech')
+    tech_ids = set(Tech.objects.values_list('id', flat=True))
+    rows = []
+    for archive in AssignmentArchive.objects.iterator():
+        # data holds (delta, tech id) pairs, see AssignmentArchive
+        values = json.loads(zlib.decompress(archive.data)) if archive.data else []
+        rows += [
+            ArchivedTechDay(archive_id=archive.pk, tech_id=tech_id)
+            for tech_id in set(values[1::2]) & tech_ids
+        ]
+    ArchivedTechDay.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rotation', '0013_technametoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTechDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tech_days', to='Rotation.assignmentarchive')),
+                ('tech', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_days', to='Rotation.tech')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tech', 'archive'), name='rotation_archived_tech_day_unique')],
+            },
+        ),
+        migrations.RunPython(fill_archived_tech_days, migrations.RunPython.noop),
+    ]
@@ -1,20 +1,137 @@
 # Rotation/models.py
 
-from django.db import models
+import json
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
-from .constants import ASSIGNMENT_HISTORY_LIMIT
+from .constants import ASSIGNMENT_HISTORY_LIMIT, MAX_UNAVAILABILITY_DAYS
+from .routers import use_primary
+
+def normalize_name(name):
+    return ' '.join(name.split()).casefold()
+
+class TechQuerySet(models.QuerySet):
+    """Keeps name_normalized and the name tokens in step on bulk paths that
+    bypass Tech.save()."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for tech in objs:
+            tech.name_normalized = normalize_name(tech.name)
+        with transaction.atomic():
+            created = super().bulk_create(objs, *args, **kwargs)
+            # Rows skipped by ignore_conflicts come back without a pk.
+            Tech.index_names([tech for tech in created if tech.pk])
+        return created
+
+    def update(self, **kwargs):
+        if 'name' not in kwargs:
+            return super().update(**kwargs)
+        with use_primary(), transaction.atomic():
+            pks = list(self.values_list('pk', flat=True))
+            count = super().update(**kwargs)
+            # Re-read rather than use kwargs['name'], which may be an expression.
+            techs = list(Tech.objects.filter(pk__in=pks).only('id', 'name'))
+            for tech in techs:
+                tech.name_normalized = normalize_name(tech.name)
+            Tech.objects.bulk_update(techs, ['name_normalized'])
+            Tech.index_names(techs)
+        return count
 
 class Tech(models.Model):
     name = models.CharField(max_length=100)
     active = models.BooleanField(default=True)
+    # Casefolded copy of name, set by save() and TechQuerySet; orders search()
+    # results, while TechNameToken holds its words for matching.
+    name_normalized = models.CharField(max_length=100, db_index=True, editable=False, default='')
+
+    objects = TechQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Roster pages filter on active and page through ids (see roster.py).
+            models.Index(fields=['active', 'id'], name='rotation_tech_active_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
-    def get_next(self):
-        next_tech = Tech.objects.filter(active=True, id__gt=self.id).order_by('id').first()
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        tech = super().from_db(db, field_names, values)
+        # What the tokens were built from, so save() can skip re-indexing.
+        tech._indexed_name = tech.__dict__.get('name_normalized')
+        return tech
+
+    def save(self, *args, **kwargs):
+        self.name_normalized = normalize_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_normalized'}
+        reindex = (update_fields is None or 'name' in update_fields) and \
+            self.name_normalized != getattr(self, '_indexed_name', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if reindex:
+                Tech.index_names([self])
+                self._indexed_name = self.name_normalized
+
+    @classmethod
+    def index_names(cls, techs):
+        """Rebuild the search tokens of saved ``techs`` from name_normalized."""
+        TechNameToken.objects.filter(tech__in=techs).delete()
+        TechNameToken.objects.bulk_create([
+            TechNameToken(tech=tech, token=token)
+            for tech in techs for token in sorted(set(tech.name_normalized.split()))
+        ])
+
+    @classmethod
+    def search(cls, query, queryset=None):
+        """Techs with a word starting with each word of ``query``, ignoring case.
+
+        So "smith" and "al sm" both find "Alice Smith". Each word is a range
+        on the indexed TechNameToken.token rather than LIKE, which SQLite
+        cannot serve from a case-sensitive index.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        words = normalize_name(query).split()
+        if not words:
+            return queryset.none()
+        for word in words:
+            queryset = queryset.filter(id__in=TechNameToken.objects.filter(
+                token__gte=word, token__lt=word + '\U0010ffff'
+            ).values('tech_id'))
+        return queryset.order_by('name_normalized', 'id')
+
+    @classmethod
+    def eligible(cls, day=None):
+        """Active techs not marked unavailable on ``day`` (default: today)."""
+        unavailable = UnavailableDay.objects.filter(day=day or timezone.localdate()).values('tech_id')
+        return cls.objects.filter(active=True).exclude(id__in=unavailable)
+
+    @classmethod
+    def get_first(cls, day=None):
+        first = cls.eligible(day).order_by('id').first()
+        if not first:
+            # Everyone is away; keep the rotation going regardless.
+            first = cls.objects.filter(active=True).order_by('id').first()
+        return first
+
+    def get_next(self, day=None):
+        eligible = Tech.eligible(day)
+        next_tech = eligible.filter(id__gt=self.id).order_by('id').first()
+        if not next_tech:
+            next_tech = eligible.order_by('id').first()
         if not next_tech:
-            next_tech = Tech.objects.filter(active=True).exclude(id=self.id).order_by('id').first()
+            # Everyone is away; keep the rotation going regardless.
+            next_tech = Tech.objects.filter(active=True, id__gt=self.id).order_by('id').first()
+            if not next_tech:
+                next_tech = Tech.objects.filter(active=True).exclude(id=self.id).order_by('id').first()
         return next_tech or self
 
     def get_previous(self):
@@ -35,66 +152,288 @@ class Tech(models.Model):
         
         return previous_assignments[previous_index].tech
 
+class TechNameToken(models.Model):
+    """One row per distinct word of a tech's normalized name, maintained by
+    Tech.index_names(), so search() can match the start of any word."""
+    tech = models.ForeignKey(Tech, on_delete=models.CASCADE, related_name='name_tokens')
+    token = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['token', 'tech'], name='rotation_tech_token_idx'),
+        ]
+
+class UnavailabilityQuerySet(models.QuerySet):
+    """Keeps UnavailableDay in step on bulk paths that bypass
+    Unavailability.save(); invalid ranges raise and roll back."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for unavailability in objs:
+            unavailability.clean()
+        with transaction.atomic():
+            created = super().bulk_create(objs, *args, **kwargs)
+            for unavailability in created:
+                if unavailability.pk:
+                    unavailability.rebuild_days()
+        return created
+
+    def update(self, **kwargs):
+        if not {'start_date', 'end_date', 'tech', 'tech_id'} & kwargs.keys():
+            return super().update(**kwargs)
+        with use_primary(), transaction.atomic():
+            pks = list(self.values_list('pk', flat=True))
+            count = super().update(**kwargs)
+            for unavailability in Unavailability.objects.filter(pk__in=pks):
+                unavailability.clean()
+                unavailability.rebuild_days()
+        return count
+
+class Unavailability(models.Model):
+    tech = models.ForeignKey(Tech, on_delete=models.CASCADE, related_name='unavailabilities')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    reason = models.CharField(max_length=200, blank=True)
+
+    objects = UnavailabilityQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['start_date']
+
+    def __str__(self):
+        return f'{self.tech} unavailable {self.start_date} to {self.end_date}'
+
+    def clean(self):
+        # Checked here rather than in a form so the admin inline enforces it
+        # too, and again by save() since it expands the range into one
+        # UnavailableDay per day.
+        start, end = self.start_date, self.end_date
+        if start and end:
+            if end < start:
+                raise ValidationError("End date must be on or after the start date.")
+            if (end - start).days + 1 > MAX_UNAVAILABILITY_DAYS:
+                raise ValidationError(f"A single range can cover at most {MAX_UNAVAILABILITY_DAYS} days.")
+
+    def save(self, *args, **kwargs):
+        self.clean()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.rebuild_days()
+
+    def rebuild_days(self):
+        self.days.all().delete()
+        UnavailableDay.objects.bulk_create([
+            UnavailableDay(unavailability=self, tech_id=self.tech_id, day=self.start_date + timedelta(days=offset))
+            for offset in range((self.end_date - self.start_date).days + 1)
+        ])
+
+class UnavailableDay(models.Model):
+    """One row per tech per day off, expanded from Unavailability so that
+    eligibility is a single indexed lookup on ``day``. Rows go away with
+    their Unavailability via the cascade."""
+    unavailability = models.ForeignKey(Unavailability, on_delete=models.CASCADE, related_name='days')
+    tech = models.ForeignKey(Tech, on_delete=models.CASCADE)
+    day = models.DateField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['day', 'tech'], name='rotation_unavailable_day_idx'),
+        ]
+
 class TechAssignment(models.Model):
     tech = models.ForeignKey(Tech, on_delete=models.CASCADE)
-    assigned_at = models.DateTimeField(default=timezone.now)
+    assigned_at = models.DateTimeField(default=timezone.now, db_index=True)
     is_current = models.BooleanField(default=True)
 
     class Meta:
         ordering = ['-assigned_at']
 
+    @classmethod
+    def prune_history(cls, keep=ASSIGNMENT_HISTORY_LIMIT):
+        # Keep the current entry plus the newest others, ``keep`` in all, and
+        # move the rest to the archive
+        old_assignments = cls.objects.filter(is_current=False).order_by('-assigned_at')[max(keep - 1, 0):]
+        return AssignmentArchive.archive(cls.objects.filter(pk__in=old_assignments))
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+class AssignmentArchive(models.Model):
+    """Assignments compacted out of TechAssignment, one row per local day.
+
+    ``data`` is zlib-compressed JSON: a flat list of (microseconds since the
+    previous entry, tech id) pairs in time order, the first measured from
+    the Unix epoch. Archived assignments are never current.
+    """
+    day = models.DateField(unique=True)
+    count = models.PositiveIntegerField(default=0)
+    data = models.BinaryField()
+
+    class Meta:
+        ordering = ['day']
+
+    def get_entries(self):
+        values = json.loads(zlib.decompress(self.data)) if self.data else []
+        moment, entries = EPOCH, []
+        for index in range(0, len(values), 2):
+            moment += values[index] * MICROSECOND
+            entries.append((moment, values[index + 1]))
+        return entries
+
+    def set_entries(self, entries):
+        previous, values = EPOCH, []
+        for moment, tech_id in sorted(entries):
+            values += [(moment - previous) // MICROSECOND, tech_id]
+            previous = moment
+        self.data = zlib.compress(json.dumps(values, separators=(',', ':')).encode())
+        self.count = len(values) // 2
+
+    @classmethod
+    def archive(cls, assignments):
+        """Move ``assignments`` (a TechAssignment queryset) into the archive.
+
+        The rows are read only once the write lock is held, so concurrent
+        archivers (e.g. two overlapping Next clicks) run one after the other
+        and the later one finds nothing left to move.
+        """
+        with use_primary(), transaction.atomic():
+            Settings.lock()
+            rows = list(assignments.values_list('pk', 'assigned_at', 'tech_id'))
+            if not rows:
+                return 0
+            by_day = defaultdict(list)
+            for pk, assigned_at, tech_id in rows:
+                by_day[timezone.localtime(assigned_at).date()].append((assigned_at, tech_id))
+
+            existing = cls.objects.in_bulk(list(by_day), field_name='day')
+            created, updated = [], []
+            for day, entries in by_day.items():
+                archive = existing.get(day)
+                if archive:
+                    archive.set_entries(archive.get_entries() + entries)
+                    updated.append(archive)
+                else:
+                    archive = cls(day=day)
+                    archive.set_entries(entries)
+                    created.append(archive)
+            cls.objects.bulk_create(created)
+            cls.objects.bulk_update(updated, ['data', 'count'])
+            ArchivedTechDay.objects.bulk_create([
+                ArchivedTechDay(archive=archive, tech_id=tech_id)
+                for archive in created + updated
+                for tech_id in {entry[1] for entry in by_day[archive.day]}
+            ], ignore_conflicts=True)
+            TechAssignment.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        return len(rows)
+
+    @classmethod
+    def forget_tech(cls, tech_id):
+        """Drop a deleted tech's entries, as the cascade does for its hot assignments.
+
+        Only the days ArchivedTechDay lists for the tech are decoded and rewritten.
+        """
+        with use_primary(), transaction.atomic():
+            Settings.lock()
+            updated, emptied = [], []
+            for archive in cls.objects.filter(tech_days__tech_id=tech_id):
+                kept = [entry for entry in archive.get_entries() if entry[1] != tech_id]
+                if kept:
+                    archive.set_entries(kept)
+                    updated.append(archive)
+                else:
+                    emptied.append(archive.pk)
+            cls.objects.bulk_update(updated, ['data', 'count'])
+            cls.objects.filter(pk__in=emptied).delete()
+            ArchivedTechDay.objects.filter(tech_id=tech_id).delete()
+
+class ArchivedTechDay(models.Model):
+    """Which techs appear in each AssignmentArchive row, written by
+    archive(), so forget_tech() touches only the days a tech was on."""
+    archive = models.ForeignKey(AssignmentArchive, on_delete=models.CASCADE, related_name='tech_days')
+    tech = models.ForeignKey(Tech, on_delete=models.CASCADE, related_name='archived_days')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tech', 'archive'], name='rotation_archived_tech_day_unique'),
+        ]
+
+def forget_archived_assignments(sender, instance, **kwargs):
+    AssignmentArchive.forget_tech(instance.pk)
+
 class Settings(models.Model):
     current_tech = models.ForeignKey(Tech, on_delete=models.SET_NULL, null=True, related_name='current_settings')
     previous_tech = models.ForeignKey(Tech, on_delete=models.SET_NULL, null=True, related_name='previous_settings')
     database_location = models.CharField(max_length=255, blank=True)
+    # Occurrence the rotation scheduler last advanced for (see scheduler.py).
+    last_scheduled_at = models.DateTimeField(null=True, blank=True)
 
     def update_current_tech(self, new_tech, direction='forward'):
-        current_time = timezone.now()
-
-        if direction == 'forward':
-            # Check if there's already a current assignment for today
-            today_assignment = TechAssignment.objects.filter(
-                is_current=True,
-                assigned_at__date=current_time.date()
-            ).first()
-
-            if today_assignment and today_assignment.tech == new_tech:
-                # If the same tech is already assigned for today, do nothing
-                return
-            
-            # Set all current assignments to False
-            TechAssignment.objects.filter(is_current=True).update(is_current=False)
-            
-            self.previous_tech = self.current_tech
-            self.current_tech = new_tech
+        """Move the rotation and return the assignment that is now current,
+        or None if nothing changed.
+
+        Runs under the write lock from the first read, so overlapping calls
+        move the rotation one after the other.
+        """
+        with use_primary(), transaction.atomic():
+            Settings.lock()
+            self.refresh_from_db()
+            current_time = timezone.now()
+            now_current = None
+
+            if direction == 'forward':
+                # Check if there's already a current assignment for today
+                today_assignment = TechAssignment.objects.filter(
+                    is_current=True,
+                    assigned_at__date=current_time.date()
+                ).first()
+
+                if today_assignment and today_assignment.tech == new_tech:
+                    # If the same tech is already assigned for today, do nothing
+                    return
+                
+                # Set all current assignments to False
+                TechAssignment.objects.filter(is_current=True).update(is_current=False)
+                
+                self.previous_tech = self.current_tech
+                self.current_tech = new_tech
+                
+                # Create a new assignment for the new tech
+                now_current = TechAssignment.objects.create(tech=new_tech, is_current=True, assigned_at=current_time)
+                
+                TechAssignment.prune_history()
             
-            # Create a new assignment for the new tech
-            TechAssignment.objects.create(tech=new_tech, is_current=True, assigned_at=current_time)
+            elif direction == 'backward':
+                current_assignment = TechAssignment.objects.filter(is_current=True).order_by('-assigned_at').first()
+                if current_assignment:
+                    previous_assignment = TechAssignment.objects.filter(
+                        assigned_at__lt=current_assignment.assigned_at
+                    ).order_by('-assigned_at').first()
+                    
+                    if previous_assignment:
+                        TechAssignment.objects.filter(is_current=True).update(is_current=False)
+                        previous_assignment.is_current = True
+                        previous_assignment.save()
+                        self.previous_tech = self.current_tech
+                        self.current_tech = previous_assignment.tech
+                        now_current = previous_assignment
+                    else:
+                        # If there's no previous assignment, stay on the current one
+                        return
             
-            # Ensure we only keep the last ASSIGNMENT_HISTORY_LIMIT entries
-            old_assignments = TechAssignment.objects.order_by('-assigned_at')[ASSIGNMENT_HISTORY_LIMIT:]
-            TechAssignment.objects.filter(pk__in=old_assignments).delete()
-        
-        elif direction == 'backward':
-            current_assignment = TechAssignment.objects.filter(is_current=True).order_by('-assigned_at').first()
-            if current_assignment:
-                previous_assignment = TechAssignment.objects.filter(
-                    assigned_at__lt=current_assignment.assigned_at
-                ).order_by('-assigned_at').first()
-                
-                if previous_assignment:
-                    TechAssignment.objects.filter(is_current=True).update(is_current=False)
-                    previous_assignment.is_current = True
-                    previous_assignment.save()
-                    self.previous_tech = self.current_tech
-                    self.current_tech = previous_assignment.tech
-                else:
-                    # If there's no previous assignment, stay on the current one
-                    return
-        
-        self.save()
+            self.save()
+        return now_current
 
     @classmethod
     def load(cls):
         obj, created = cls.objects.get_or_create(pk=1)
         return obj
+
+    @classmethod
+    def lock(cls):
+        """Take the database write lock; call first inside transaction.atomic().
+
+        A no-op write to the settings row, so SQLite's write lock (or the row
+        lock on other backends) is held before anything is read.
+        """
+        if not cls.objects.filter(pk=1).update(last_scheduled_at=F('last_scheduled_at')):
+            cls.load()
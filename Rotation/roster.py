@@ -0,0 +1,49 @@
+from .constants import ROSTER_PAGE_SIZE
+from .forms import RosterFilterForm
+from .models import Tech
+
+ROSTER_FIELDS = ('id', 'name', 'active')
+
+def roster_page(params, current_tech_id=None, next_tech_id=None, page_size=ROSTER_PAGE_SIZE):
+    """One keyset page of the roster in rotation (id) order, as dicts.
+
+    ``params`` is the request's GET data: ``status`` filters on active,
+    ``after``/``before`` are the last/first id of the neighbouring page.
+    Fetches ``page_size + 1`` rows to know whether another page exists, so
+    the cost is the same on every page. ``is_current``/``is_next`` are set
+    from the ids passed in rather than compared per row in the template.
+    """
+    form = RosterFilterForm(params)
+    cleaned = form.cleaned_data if form.is_valid() else {}
+    status = cleaned.get('status') or ''
+    after, before = cleaned.get('after'), cleaned.get('before')
+
+    techs = Tech.objects.all()
+    if status:
+        techs = techs.filter(active=status == 'active')
+
+    if before is not None and after is None:
+        rows = list(techs.filter(id__lt=before).order_by('-id').values(*ROSTER_FIELDS)[:page_size + 1])
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next = True
+    else:
+        if after is not None:
+            techs = techs.filter(id__gt=after)
+        rows = list(techs.order_by('id').values(*ROSTER_FIELDS)[:page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = after is not None
+
+    for row in rows:
+        row['is_current'] = row['id'] == current_tech_id
+        row['is_next'] = row['id'] == next_tech_id
+
+    return {
+        'rows': rows,
+        'status': status,
+        'has_previous': has_previous and bool(rows),
+        'has_next': has_next and bool(rows),
+        'previous_before': rows[0]['id'] if rows else None,
+        'next_after': rows[-1]['id'] if rows else None,
+    }
@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+from .utils import READONLY_DATABASE
+
+_use_primary = ContextVar('rotation_use_primary', default=False)
+
+@contextmanager
+def use_primary():
+    """Send reads to the primary too, e.g. while a view is about to write."""
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+def primary_db(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with use_primary():
+            return view(*args, **kwargs)
+    return wrapper
+
+class ReadWriteRouter:
+    """Reads go to the read-only alias, writes to ``default``.
+
+    Both aliases open the same SQLite file, so there is no replication lag;
+    the split only keeps dashboard reads off the writer's connection. When
+    the read-only alias is not configured (e.g. under tests) everything
+    stays on ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_primary.get() or READONLY_DATABASE not in settings.DATABASES:
+            return 'default'
+        return READONLY_DATABASE
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
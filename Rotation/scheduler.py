@@ -0,0 +1,143 @@
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.utils import timezone
+from .constants import ASSIGNMENT_HISTORY_LIMIT
+from .models import Tech, TechAssignment, Settings, UnavailableDay
+from .routers import use_primary
+
+FREQUENCIES = ['daily', 'weekdays', 'weekly']
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+class Schedule:
+    """When the rotation advances: every day, every weekday, or one day a week, at ``at`` local time."""
+
+    def __init__(self, frequency='daily', at=time(8, 0), weekday=0):
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency {frequency!r}; expected one of {', '.join(FREQUENCIES)}.")
+        self.frequency = frequency
+        self.at = at
+        self.weekday = weekday
+
+    def __str__(self):
+        when = self.at.strftime('%H:%M')
+        if self.frequency == 'weekly':
+            return f'weekly on {WEEKDAYS[self.weekday]} at {when}'
+        return f'{self.frequency} at {when}'
+
+    def runs_on(self, day):
+        if self.frequency == 'weekdays':
+            return day.weekday() < 5
+        if self.frequency == 'weekly':
+            return day.weekday() == self.weekday
+        return True
+
+    def occurrence_on(self, day):
+        return timezone.make_aware(datetime.combine(day, self.at), timezone.get_current_timezone())
+
+    def occurrences(self, after, until):
+        """Occurrences in ``(after, until]``, oldest first."""
+        day = timezone.localtime(after).date()
+        last_day = timezone.localtime(until).date()
+        while day <= last_day:
+            if self.runs_on(day):
+                when = self.occurrence_on(day)
+                if after < when <= until:
+                    yield when
+            day += timedelta(days=1)
+
+    def next_after(self, moment):
+        day = timezone.localtime(moment).date()
+        while True:
+            if self.runs_on(day):
+                when = self.occurrence_on(day)
+                if when > moment:
+                    return when
+            day += timedelta(days=1)
+
+def rotation_sequence(active_ids, current_id, count, unavailable=None):
+    """The next ``count`` tech ids after ``current_id``, following Tech.get_next().
+
+    ``unavailable`` optionally gives, per step, the set of tech ids away
+    that day; they are skipped unless nobody would be left.
+    """
+    if not active_ids:
+        return []
+    sequence = []
+    for step in range(count):
+        away = unavailable[step] if unavailable else None
+        candidates = [tech_id for tech_id in active_ids if tech_id not in away] if away else active_ids
+        candidates = candidates or active_ids
+        if current_id is None:
+            current_id = candidates[0]
+        else:
+            index = bisect_right(candidates, current_id)
+            current_id = candidates[index] if index < len(candidates) else candidates[0]
+        sequence.append(current_id)
+    return sequence
+
+def unavailable_by_day(days):
+    """Map each of ``days`` to the set of tech ids away, in one range query."""
+    away = {day: set() for day in days}
+    if days:
+        rows = UnavailableDay.objects.filter(day__gte=min(days), day__lte=max(days)).values_list('day', 'tech_id')
+        for day, tech_id in rows:
+            if day in away:
+                away[day].add(tech_id)
+    return away
+
+def run_due(schedule, now=None, max_catch_up=ASSIGNMENT_HISTORY_LIMIT):
+    """Advance the rotation once per occurrence of ``schedule`` missed up to ``now``.
+
+    The oldest ``max_catch_up`` missed occurrences are written with a single
+    bulk_create; call again while it returns that many to work through a
+    longer backlog (older rows are archived by prune_history()). Safe to
+    call from several processes at once: the first statement of the
+    transaction is a write to the settings row, so SQLite's write lock (or
+    the row lock on other backends) serialises schedulers and the later ones
+    find nothing left to do. Returns the created assignments.
+    """
+    now = now or timezone.now()
+    settings_pk = Settings.load().pk
+
+    with use_primary(), transaction.atomic():
+        Settings.lock()
+        settings = Settings.objects.get(pk=settings_pk)
+        latest = TechAssignment.objects.order_by('-assigned_at').first()
+
+        reference = max(
+            (moment for moment in (settings.last_scheduled_at, latest and latest.assigned_at) if moment),
+            default=None,
+        )
+        if reference is None:
+            # Nothing has ever been assigned: start counting from now.
+            Settings.objects.filter(pk=settings_pk).update(last_scheduled_at=now)
+            return []
+
+        due = list(schedule.occurrences(reference, now))[:max_catch_up]
+        if not due:
+            return []
+
+        active_ids = list(Tech.objects.filter(active=True).order_by('id').values_list('id', flat=True))
+        current_id = latest.tech_id if latest else None
+        days = [timezone.localtime(when).date() for when in due]
+        away = unavailable_by_day(days)
+        sequence = rotation_sequence(active_ids, current_id, len(due), [away[day] for day in days])
+        if not sequence:
+            Settings.objects.filter(pk=settings_pk).update(last_scheduled_at=due[-1])
+            return []
+
+        runs = list(zip(due, sequence))
+        TechAssignment.objects.filter(is_current=True).update(is_current=False)
+        created = TechAssignment.objects.bulk_create([
+            TechAssignment(tech_id=tech_id, assigned_at=assigned_at, is_current=index == len(runs) - 1)
+            for index, (assigned_at, tech_id) in enumerate(runs)
+        ])
+        TechAssignment.prune_history()
+
+        Settings.objects.filter(pk=settings_pk).update(
+            current_tech_id=sequence[-1],
+            previous_tech_id=sequence[-2] if len(sequence) > 1 else current_id,
+            last_scheduled_at=due[-1],
+        )
+    return created
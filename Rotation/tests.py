@@ -1,9 +1,38 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from django.contrib.admin import AdminSite
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.forms import inlineformset_factory
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from unittest.mock import patch
-from .models import Tech, TechAssignment, Settings
-from .constants import ASSIGNMENT_HISTORY_LIMIT
+from .admin import TechAdmin
+from .models import ArchivedTechDay, AssignmentArchive, Tech, TechAssignment, Settings, Unavailability, UnavailableDay
+from .constants import ASSIGNMENT_HISTORY_LIMIT, SEARCH_RESULT_LIMIT
+from .loadtest import HttpResult, classify, csrf_token_from, parse_response, percentile
+from .roster import roster_page
+from .routers import ReadWriteRouter, use_primary
+from .scheduler import Schedule, rotation_sequence, run_due
+from .utils import (
+    READONLY_DATABASE, DatabaseRelocationError, backup_database, get_database_location,
+    write_database_location,
+)
 
 class MainViewTests(TestCase):
     @classmethod
@@ -157,4 +186,682 @@ class SettingsModelTests(TestCase):
                 self.settings.update_current_tech(self.tech1, direction='forward')
         
         self.assertEqual(TechAssignment.objects.count(), ASSIGNMENT_HISTORY_LIMIT)
+        self.assertEqual(sum(AssignmentArchive.objects.values_list('count', flat=True)), 5)
 
+
+class DatabaseBackupTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source_path = os.path.join(self.tmpdir, 'source.sqlite3')
+        self.target_path = os.path.join(self.tmpdir, 'copy', 'target.sqlite3')
+        source = sqlite3.connect(self.source_path)
+        source.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, payload TEXT)')
+        source.executemany('INSERT INTO item (payload) VALUES (?)', [('x' * 500,)] * 2000)
+        source.commit()
+        source.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_backup_copies_all_rows(self):
+        steps = []
+        backup_database(self.source_path, self.target_path, pages=8,
+                        progress=lambda status, remaining, total: steps.append(remaining))
+        target = sqlite3.connect(self.target_path)
+        self.assertEqual(target.execute('SELECT COUNT(*) FROM item').fetchone()[0], 2000)
+        target.close()
+        self.assertGreater(len(steps), 1)
+        self.assertEqual(steps[-1], 0)
+        self.assertEqual([f for f in os.listdir(os.path.dirname(self.target_path)) if f.endswith('.partial')], [])
+
+    def test_backup_includes_writes_made_during_copy(self):
+        writer = sqlite3.connect(self.source_path, timeout=0)
+
+        def progress(status, remaining, total):
+            # Keeps restarting the backup until it falls back to a locked pass.
+            try:
+                writer.execute("INSERT INTO item (payload) VALUES ('late')")
+                writer.commit()
+            except sqlite3.OperationalError:
+                writer.rollback()
+
+        backup_database(self.source_path, self.target_path, pages=64, progress=progress)
+        expected = writer.execute('SELECT COUNT(*) FROM item').fetchone()[0]
+        writer.close()
+        target = sqlite3.connect(self.target_path)
+        self.assertEqual(target.execute('SELECT COUNT(*) FROM item').fetchone()[0], expected)
+        target.close()
+
+    def test_verification_runs_without_write_lock(self):
+        writes = []
+
+        def verify(source, target):
+            # A writer that will not wait must still get through.
+            writer = sqlite3.connect(self.source_path, timeout=0)
+            writes.append(writer.execute('SELECT COUNT(*) FROM item').fetchone()[0])
+            writer.execute("INSERT INTO item (payload) VALUES ('during verify')")
+            writer.commit()
+            writer.close()
+
+        with patch('Rotation.utils.verify_database_copy', side_effect=verify):
+            backup_database(self.source_path, self.target_path, pages=64)
+        self.assertEqual(len(writes), 3)
+        # Every verified copy went stale, so it was copied once more under the lock.
+        target = sqlite3.connect(self.target_path)
+        self.assertEqual(target.execute('SELECT COUNT(*) FROM item').fetchone()[0], 2003)
+        target.close()
+
+    def test_backup_refuses_existing_target(self):
+        os.makedirs(os.path.dirname(self.target_path))
+        open(self.target_path, 'w').close()
+        with self.assertRaises(DatabaseRelocationError):
+            backup_database(self.source_path, self.target_path)
+        self.assertEqual(os.path.getsize(self.target_path), 0)
+
+    def test_backup_refuses_same_file(self):
+        with self.assertRaises(DatabaseRelocationError):
+            backup_database(self.source_path, self.source_path)
+
+    def test_write_database_location_replaces_config(self):
+        config_file = Path(self.tmpdir) / 'config.json'
+        config_file.write_text(json.dumps({'database_location': 'db/old.sqlite3', 'other': 1}))
+        with patch('Rotation.utils.CONFIG_FILE', config_file):
+            write_database_location('db/new.sqlite3')
+            self.assertEqual(get_database_location(), 'db/new.sqlite3')
+        self.assertEqual(json.loads(config_file.read_text())['other'], 1)
+        self.assertEqual(os.listdir(self.tmpdir).count('config.json'), 1)
+        self.assertFalse([f for f in os.listdir(self.tmpdir) if f.startswith('.config.')])
+
+class ReadWriteRouterTests(TestCase):
+    def setUp(self):
+        self.router = ReadWriteRouter()
+        self.databases_patch = patch('Rotation.routers.settings', SimpleNamespace(
+            DATABASES={'default': {}, READONLY_DATABASE: {}}))
+
+    def test_reads_use_readonly_alias(self):
+        with self.databases_patch:
+            self.assertEqual(self.router.db_for_read(Tech), READONLY_DATABASE)
+            self.assertEqual(self.router.db_for_write(Tech), 'default')
+
+    def test_use_primary_sends_reads_to_default(self):
+        with self.databases_patch, use_primary():
+            self.assertEqual(self.router.db_for_read(Tech), 'default')
+        with self.databases_patch:
+            self.assertEqual(self.router.db_for_read(Tech), READONLY_DATABASE)
+
+    def test_reads_fall_back_to_default_without_readonly_alias(self):
+        self.assertEqual(self.router.db_for_read(Tech), 'default')
+
+    def test_migrations_only_on_default(self):
+        self.assertTrue(self.router.allow_migrate('default', 'Rotation'))
+        self.assertFalse(self.router.allow_migrate(READONLY_DATABASE, 'Rotation'))
+
+# Run by ReadOnlyAliasTests in a separate process with the normal (non-test)
+# settings, so both aliases open the real file; prints its findings as JSON.
+READONLY_ALIAS_SCRIPT = """
+import json, os
+from django.db import connections, OperationalError
+from Rotation.models import Tech
+from Rotation.routers import ReadWriteRouter
+from Rotation.utils import DATABASE_LOCATION_ENV, backup_database, sync_database_connection
+result = {}
+Tech.objects.create(name='Before')
+result['journal_mode'] = connections['default'].cursor().execute('PRAGMA journal_mode').fetchone()[0]
+result['read_alias'] = ReadWriteRouter().db_for_read(Tech)
+result['readonly_name'] = connections['readonly'].settings_dict['NAME']
+result['read'] = list(Tech.objects.values_list('name', flat=True))
+try:
+    connections['readonly'].cursor().execute("INSERT INTO Rotation_tech (name, active, name_normalized) VALUES ('x', 1, 'x')")
+    result['readonly_write'] = 'allowed'
+except OperationalError as e:
+    result['readonly_write'] = str(e)
+result['query_only'] = connections['readonly'].cursor().execute('PRAGMA query_only').fetchone()[0]
+moved = os.environ[DATABASE_LOCATION_ENV] + '.moved'
+backup_database(os.environ[DATABASE_LOCATION_ENV], moved)
+Tech.objects.create(name='Only in old')
+os.environ[DATABASE_LOCATION_ENV] = moved
+sync_database_connection()
+result['names_after'] = {alias: str(connections[alias].settings_dict['NAME']) for alias in ('default', 'readonly')}
+result['read_after'] = list(Tech.objects.values_list('name', flat=True))
+print(json.dumps(result))
+"""
+
+class ReadOnlyAliasTests(SimpleTestCase):
+    def test_readonly_alias_against_file_database(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'rotation.sqlite3')
+        env = dict(os.environ, NEXTECH_DATABASE_LOCATION=path)
+        manage = [sys.executable, str(settings.BASE_DIR / 'manage.py')]
+        subprocess.run(manage + ['migrate', '--noinput', '-v0'], env=env, check=True, capture_output=True)
+        output = subprocess.run(manage + ['shell', '-c', READONLY_ALIAS_SCRIPT], env=env, check=True,
+                                capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+
+        self.assertEqual(result['journal_mode'], 'wal')
+        self.assertEqual(result['read_alias'], READONLY_DATABASE)
+        self.assertTrue(result['readonly_name'].endswith('?mode=ro'))
+        self.assertEqual(result['read'], ['Before'])
+        self.assertIn('readonly database', result['readonly_write'])
+        self.assertEqual(result['query_only'], 1)
+
+        # After the relocation both aliases open the copy, and routed reads see it.
+        moved = path + '.moved'
+        self.assertEqual(result['names_after'], {'default': moved, READONLY_DATABASE: Path(moved).as_uri() + '?mode=ro'})
+        self.assertEqual(result['read_after'], ['Before'])
+
+class AssignmentExportViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tech1 = Tech.objects.create(name="Alice", active=True)
+        cls.tech2 = Tech.objects.create(name="Bob, Jr.", active=True)
+        tz = timezone.get_current_timezone()
+        cls.day1 = timezone.datetime(2024, 7, 1, 23, 30, tzinfo=tz)
+        cls.day2 = timezone.datetime(2024, 7, 2, 8, 0, tzinfo=tz)
+        cls.day3 = timezone.datetime(2024, 7, 3, 8, 0, tzinfo=tz)
+        TechAssignment.objects.create(tech=cls.tech1, assigned_at=cls.day1, is_current=False)
+        TechAssignment.objects.create(tech=cls.tech2, assigned_at=cls.day2, is_current=False)
+        TechAssignment.objects.create(tech=cls.tech1, assigned_at=cls.day3, is_current=True)
+
+    def get_export(self, **params):
+        response = self.client.get(reverse('export_assignments'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_all(self):
+        rows = list(csv.reader(io.StringIO(self.get_export())))
+        self.assertEqual(rows[0], ['assigned_at', 'tech_id', 'tech_name', 'is_current'])
+        self.assertEqual([row[2] for row in rows[1:]], ['Alice', 'Bob, Jr.', 'Alice'])
+        self.assertEqual(rows[1][0], timezone.localtime(self.day1).isoformat())
+
+    def test_date_range_is_inclusive_local_days(self):
+        rows = list(csv.reader(io.StringIO(self.get_export(start='2024-07-01', end='2024-07-02'))))
+        self.assertEqual([row[2] for row in rows[1:]], ['Alice', 'Bob, Jr.'])
+
+    def test_ndjson_export(self):
+        lines = self.get_export(format='ndjson', start='2024-07-03').splitlines()
+        self.assertEqual(len(lines), 1)
+        record = json.loads(lines[0])
+        self.assertEqual(record['tech_id'], self.tech1.id)
+        self.assertTrue(record['is_current'])
+
+    def test_invalid_range(self):
+        response = self.client.get(reverse('export_assignments'), {'start': '2024-07-03', 'end': '2024-07-01'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('export_assignments'), {'start': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+class SchedulerTests(TestCase):
+    def setUp(self):
+        self.tech1 = Tech.objects.create(name="Alice", active=True)
+        self.tech2 = Tech.objects.create(name="Bob", active=True)
+        self.tech3 = Tech.objects.create(name="Charlie", active=True)
+        self.settings = Settings.load()
+        self.tz = timezone.get_current_timezone()
+        self.schedule = Schedule('daily', datetime.time(8, 0))
+
+    def local(self, *args):
+        return timezone.datetime(*args, tzinfo=self.tz)
+
+    def test_occurrences(self):
+        weekdays = Schedule('weekdays', datetime.time(8, 0))
+        # Friday 09:00 to the following Tuesday 08:00
+        due = list(weekdays.occurrences(self.local(2024, 7, 5, 9), self.local(2024, 7, 9, 8)))
+        self.assertEqual(due, [self.local(2024, 7, 8, 8), self.local(2024, 7, 9, 8)])
+        weekly = Schedule('weekly', datetime.time(8, 0), weekday=2)
+        self.assertEqual(weekly.next_after(self.local(2024, 7, 10, 8)), self.local(2024, 7, 17, 8))
+
+    def test_rotation_sequence_matches_get_next(self):
+        ids = [self.tech1.id, self.tech2.id, self.tech3.id]
+        self.assertEqual(rotation_sequence(ids, None, 4), ids + [self.tech1.id])
+        self.assertEqual(rotation_sequence(ids, self.tech2.id, 2), [self.tech3.id, self.tech1.id])
+        self.assertEqual(rotation_sequence([], self.tech2.id, 2), [])
+
+    def test_catch_up_bulk_creates_missed_periods(self):
+        TechAssignment.objects.create(tech=self.tech1, assigned_at=self.local(2024, 7, 1, 8))
+        with CaptureQueriesContext(connection) as queries:
+            created = run_due(self.schedule, now=self.local(2024, 7, 4, 12))
+        inserts = [query for query in queries.captured_queries
+                   if query['sql'].startswith('INSERT INTO "Rotation_techassignment"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual([a.tech for a in created], [self.tech2, self.tech3, self.tech1])
+        self.assertEqual(TechAssignment.objects.filter(is_current=True).get().assigned_at, self.local(2024, 7, 4, 8))
+        self.settings.refresh_from_db()
+        self.assertEqual(self.settings.current_tech, self.tech1)
+        self.assertEqual(self.settings.previous_tech, self.tech3)
+
+    def test_run_due_is_idempotent(self):
+        TechAssignment.objects.create(tech=self.tech1, assigned_at=self.local(2024, 7, 1, 8))
+        now = self.local(2024, 7, 2, 12)
+        self.assertEqual(len(run_due(self.schedule, now=now)), 1)
+        self.assertEqual(run_due(self.schedule, now=now), [])
+        self.assertEqual(TechAssignment.objects.count(), 2)
+
+    def test_catch_up_limit_records_every_period_in_batches(self):
+        TechAssignment.objects.create(tech=self.tech1, assigned_at=self.local(2024, 7, 1, 8))
+        now = self.local(2024, 7, 5, 12)
+        # Four periods were missed (tech2, tech3, tech1, tech2); two are recorded per call.
+        created = run_due(self.schedule, now=now, max_catch_up=2)
+        self.assertEqual([a.tech for a in created], [self.tech2, self.tech3])
+        created = run_due(self.schedule, now=now, max_catch_up=2)
+        self.assertEqual([a.tech for a in created], [self.tech1, self.tech2])
+        self.assertEqual(run_due(self.schedule, now=now, max_catch_up=2), [])
+        self.assertEqual(TechAssignment.objects.count(), 5)
+        self.assertEqual(TechAssignment.objects.get(is_current=True).assigned_at, self.local(2024, 7, 5, 8))
+
+    def test_catch_up_beyond_history_limit_is_archived(self):
+        TechAssignment.objects.create(tech=self.tech1, assigned_at=self.local(2024, 1, 1, 8))
+        created = run_due(self.schedule, now=self.local(2024, 12, 31, 12), max_catch_up=1000)
+        self.assertEqual(len(created), 365)
+        self.assertEqual(TechAssignment.objects.count(), ASSIGNMENT_HISTORY_LIMIT)
+        archived = sum(AssignmentArchive.objects.values_list('count', flat=True))
+        self.assertEqual(TechAssignment.objects.count() + archived, 366)
+
+    def test_first_run_without_history_starts_from_now(self):
+        self.assertEqual(run_due(self.schedule, now=self.local(2024, 7, 1, 12)), [])
+        created = run_due(self.schedule, now=self.local(2024, 7, 2, 8, 30))
+        self.assertEqual([a.tech for a in created], [self.tech1])
+
+class TechSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = Tech.objects.create(name="Alice  Smith", active=True)
+        cls.alan = Tech.objects.create(name="alan", active=False)
+        cls.bob = Tech.objects.create(name="Bob", active=True)
+
+    def test_name_normalized_on_save(self):
+        self.assertEqual(self.alice.name_normalized, 'alice smith')
+        self.alice.name = 'ALICE Jones'
+        self.alice.save(update_fields=['name'])
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.name_normalized, 'alice jones')
+
+    def test_search_is_case_insensitive_prefix(self):
+        self.assertEqual(list(Tech.search('AL')), [self.alan, self.alice])
+        self.assertEqual(list(Tech.search('alice s')), [self.alice])
+        self.assertEqual(list(Tech.search('lice')), [])
+        self.assertEqual(list(Tech.search('  ')), [])
+
+    def test_search_matches_any_word(self):
+        self.assertEqual(list(Tech.search('SMI')), [self.alice])
+        self.assertEqual(list(Tech.search('sm al')), [self.alice])
+        self.assertEqual(list(Tech.search('smith bob')), [])
+        self.alice.name = 'Alice Jones'
+        self.alice.save()
+        self.assertEqual(list(Tech.search('smith')), [])
+        self.assertEqual(list(Tech.search('jo')), [self.alice])
+
+    def test_save_without_name_change_keeps_tokens(self):
+        tech = Tech.objects.get(pk=self.alice.pk)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('tech_update', args=[tech.pk]), {'name': 'Alice  Smith', 'active': ''})
+            tech.active = True
+            tech.save()
+        self.assertTrue(Tech.objects.get(pk=tech.pk).active)
+        self.assertFalse([query for query in queries.captured_queries if 'Rotation_technametoken' in query['sql']])
+        tech.name = 'Alice Smithson'
+        tech.save()
+        self.assertEqual(list(Tech.search('smithson')), [self.alice])
+
+    def test_bulk_paths_keep_search_index(self):
+        carol, = Tech.objects.bulk_create([Tech(name='Carol  DANVERS')])
+        self.assertEqual(Tech.objects.get(pk=carol.pk).name_normalized, 'carol danvers')
+        self.assertEqual(list(Tech.search('danv')), [carol])
+        Tech.objects.filter(pk=carol.pk).update(name=Concat(Value('Maria '), F('name')))
+        self.assertEqual(Tech.objects.get(pk=carol.pk).name_normalized, 'maria carol danvers')
+        self.assertEqual(list(Tech.search('mar')), [carol])
+
+    def test_admin_search_matches_any_word(self):
+        admin = TechAdmin(Tech, AdminSite())
+        queryset, may_have_duplicates = admin.get_search_results(None, Tech.objects.all(), 'smith')
+        self.assertEqual(list(queryset), [self.alice])
+
+    def test_search_view(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('tech_search'), {'q': 'b'})
+        self.assertEqual(response.json(), {'results': [{'id': self.bob.id, 'name': 'Bob', 'active': True}]})
+
+    def test_search_view_limits_results(self):
+        Tech.objects.bulk_create([Tech(name=f'Zed {i}') for i in range(SEARCH_RESULT_LIMIT + 5)])
+        response = self.client.get(reverse('tech_search'), {'q': 'zed'})
+        self.assertEqual(len(response.json()['results']), SEARCH_RESULT_LIMIT)
+
+class LoadTestHelperTests(TestCase):
+    def test_parse_response_and_csrf_token(self):
+        result = parse_response(
+            b'HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n'
+            b'Set-Cookie: csrftoken=abc123; expires=Thu, 01 Jan 2099 00:00:00 GMT; Path=/\r\n\r\n<html>'
+        )
+        self.assertEqual(result.status, 200)
+        self.assertEqual(result.body, b'<html>')
+        self.assertEqual(csrf_token_from(result), 'abc123')
+
+    def test_classify(self):
+        self.assertEqual(classify(HttpResult(302, [], b'')), 'ok')
+        self.assertEqual(classify(HttpResult(403, [], b'')), 'error')
+        self.assertEqual(classify(HttpResult(500, [], b'OperationalError: database is locked')), 'locked')
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertIsNone(percentile([], 50))
+
+class RosterPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.techs = [Tech.objects.create(name=f"Tech {i}", active=i % 3 != 0) for i in range(7)]
+        cls.ids = [tech.id for tech in cls.techs]
+
+    def test_keyset_pages_forward_and_back(self):
+        first = roster_page({}, page_size=3)
+        self.assertEqual([row['id'] for row in first['rows']], self.ids[:3])
+        self.assertFalse(first['has_previous'])
+        self.assertTrue(first['has_next'])
+
+        second = roster_page({'after': first['next_after']}, page_size=3)
+        self.assertEqual([row['id'] for row in second['rows']], self.ids[3:6])
+        self.assertTrue(second['has_previous'])
+
+        back = roster_page({'before': second['previous_before']}, page_size=3)
+        self.assertEqual([row['id'] for row in back['rows']], self.ids[:3])
+        self.assertFalse(back['has_previous'])
+
+        last = roster_page({'after': second['next_after']}, page_size=3)
+        self.assertEqual([row['id'] for row in last['rows']], self.ids[6:])
+        self.assertFalse(last['has_next'])
+
+    def test_status_filter_and_flags(self):
+        page = roster_page({'status': 'inactive'}, current_tech_id=self.ids[3], next_tech_id=self.ids[1])
+        self.assertEqual([row['id'] for row in page['rows']], [self.ids[0], self.ids[3], self.ids[6]])
+        self.assertEqual([row['is_current'] for row in page['rows']], [False, True, False])
+        self.assertFalse(any(row['is_next'] for row in page['rows']))
+
+    def test_invalid_params_fall_back_to_first_page(self):
+        page = roster_page({'after': 'abc', 'status': 'bogus'}, page_size=3)
+        self.assertEqual([row['id'] for row in page['rows']], self.ids[:3])
+
+    def test_tech_list_query_count_is_bounded(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('tech_list'), {'status': 'active'})
+        self.assertContains(response, 'Tech 1')
+        self.assertNotContains(response, 'Tech 3<')
+
+    def test_main_view_marks_current_and_next(self):
+        Settings.load().update_current_tech(self.techs[1])
+        response = self.client.get(reverse('main'))
+        flags = {row['id']: (row['is_current'], row['is_next']) for row in response.context['roster']['rows']}
+        self.assertEqual(flags[self.ids[1]], (True, False))
+        self.assertEqual(flags[self.ids[2]], (False, True))
+        self.assertEqual(sum(map(any, flags.values())), 2)
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        self.tech1 = Tech.objects.create(name="Alice", active=True)
+        self.tech2 = Tech.objects.create(name="Bob", active=True)
+        self.tech3 = Tech.objects.create(name="Charlie", active=True)
+        self.today = timezone.localdate()
+
+    def away(self, tech, start_offset=0, end_offset=0):
+        return Unavailability.objects.create(
+            tech=tech,
+            start_date=self.today + datetime.timedelta(days=start_offset),
+            end_date=self.today + datetime.timedelta(days=end_offset),
+        )
+
+    def test_days_follow_range_changes(self):
+        unavailability = self.away(self.tech2, 0, 2)
+        self.assertEqual(UnavailableDay.objects.filter(tech=self.tech2).count(), 3)
+        unavailability.end_date = self.today
+        unavailability.save()
+        self.assertEqual(list(UnavailableDay.objects.values_list('day', flat=True)), [self.today])
+        unavailability.delete()
+        self.assertFalse(UnavailableDay.objects.exists())
+
+    def test_get_next_skips_unavailable_with_one_query(self):
+        self.away(self.tech2)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.tech1.get_next(), self.tech3)
+        self.assertEqual(self.tech1.get_next(day=self.today + datetime.timedelta(days=1)), self.tech2)
+
+    def test_get_next_wraps_past_unavailable(self):
+        self.away(self.tech1)
+        self.assertEqual(self.tech3.get_next(), self.tech2)
+        self.assertEqual(Tech.get_first(), self.tech2)
+
+    def test_everyone_away_falls_back_to_rotation(self):
+        for tech in (self.tech1, self.tech2, self.tech3):
+            self.away(tech)
+        self.assertEqual(self.tech1.get_next(), self.tech2)
+        self.assertEqual(Tech.get_first(), self.tech1)
+
+    def test_rotation_sequence_skips_away_techs(self):
+        ids = [self.tech1.id, self.tech2.id, self.tech3.id]
+        away = [{self.tech2.id}, set(), set(ids)]
+        self.assertEqual(rotation_sequence(ids, self.tech1.id, 3, away), [self.tech3.id, self.tech1.id, self.tech2.id])
+
+    def test_next_tech_view_skips_unavailable(self):
+        settings = Settings.load()
+        settings.update_current_tech(self.tech1)
+        self.away(self.tech2)
+        self.client.post(reverse('next_tech'))
+        settings.refresh_from_db()
+        self.assertEqual(settings.current_tech, self.tech3)
+
+    def test_admin_inline_validates_range(self):
+        Formset = inlineformset_factory(Tech, Unavailability, fields=['start_date', 'end_date', 'reason'])
+        data = {
+            'unavailabilities-TOTAL_FORMS': '1', 'unavailabilities-INITIAL_FORMS': '0',
+            'unavailabilities-0-start_date': self.today,
+            'unavailabilities-0-end_date': self.today - datetime.timedelta(days=1),
+        }
+        self.assertFalse(Formset(data, instance=self.tech1).is_valid())
+        data['unavailabilities-0-end_date'] = self.today + datetime.timedelta(days=50 * 365)
+        self.assertFalse(Formset(data, instance=self.tech1).is_valid())
+        data['unavailabilities-0-end_date'] = self.today
+        self.assertTrue(Formset(data, instance=self.tech1).is_valid())
+
+    def test_invalid_ranges_are_refused_outside_forms(self):
+        with self.assertRaises(ValidationError):
+            self.away(self.tech1, 0, -1)
+        with self.assertRaises(ValidationError):
+            Unavailability.objects.bulk_create([Unavailability(
+                tech=self.tech1, start_date=self.today, end_date=self.today + datetime.timedelta(days=50 * 365))])
+        self.assertFalse(Unavailability.objects.exists())
+
+        unavailability = self.away(self.tech1, 0, 1)
+        with self.assertRaises(ValidationError):
+            Unavailability.objects.filter(pk=unavailability.pk).update(end_date=self.today - datetime.timedelta(days=1))
+        self.assertEqual(UnavailableDay.objects.count(), 2)
+
+    def test_bulk_paths_keep_days(self):
+        Unavailability.objects.bulk_create([Unavailability(tech=self.tech1, start_date=self.today, end_date=self.today)])
+        self.assertEqual(UnavailableDay.objects.filter(tech=self.tech1).count(), 1)
+        Unavailability.objects.update(tech=self.tech2, end_date=F('end_date') + datetime.timedelta(days=2))
+        self.assertEqual(list(UnavailableDay.objects.values_list('tech_id', flat=True)), [self.tech2.id] * 3)
+
+    def test_unavailability_views(self):
+        url = reverse('tech_unavailability', args=[self.tech2.id])
+        response = self.client.post(url, {'start_date': self.today, 'end_date': self.today + datetime.timedelta(days=1)})
+        self.assertRedirects(response, url)
+        self.assertEqual(UnavailableDay.objects.filter(tech=self.tech2).count(), 2)
+
+        response = self.client.post(url, {'start_date': self.today, 'end_date': self.today - datetime.timedelta(days=1)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Unavailability.objects.count(), 1)
+
+        unavailability = Unavailability.objects.get()
+        response = self.client.post(reverse('unavailability_delete', args=[unavailability.id]))
+        self.assertRedirects(response, url)
+        self.assertFalse(UnavailableDay.objects.exists())
+
+class AssignmentArchiveTests(TestCase):
+    def setUp(self):
+        self.tech1 = Tech.objects.create(name="Alice", active=True)
+        self.tech2 = Tech.objects.create(name="Bob", active=True)
+        self.tz = timezone.get_current_timezone()
+
+    def local(self, *args):
+        return timezone.datetime(*args, tzinfo=self.tz)
+
+    def test_entries_round_trip(self):
+        archive = AssignmentArchive(day=datetime.date(2024, 7, 1))
+        entries = [(self.local(2024, 7, 1, 9, 0, 0, 123456), self.tech2.id), (self.local(2024, 7, 1, 8), self.tech1.id)]
+        archive.set_entries(entries)
+        self.assertEqual(archive.count, 2)
+        self.assertEqual(archive.get_entries(), sorted(entries))
+
+    def test_prune_history_moves_old_rows_into_day_archives(self):
+        for day in (1, 1, 2):
+            TechAssignment.objects.create(tech=self.tech1, assigned_at=self.local(2024, 7, day, 8 + day), is_current=False)
+        TechAssignment.objects.create(tech=self.tech2, assigned_at=self.local(2024, 7, 3, 8), is_current=True)
+        self.assertEqual(TechAssignment.prune_history(keep=2), 2)
+        self.assertEqual(TechAssignment.objects.count(), 2)
+        self.assertEqual(list(AssignmentArchive.objects.values_list('day', 'count')), [(datetime.date(2024, 7, 1), 2)])
+
+        # A later run merges into the existing day row.
+        TechAssignment.objects.create(tech=self.tech2, assigned_at=self.local(2024, 7, 1, 12), is_current=False)
+        TechAssignment.prune_history(keep=2)
+        self.assertEqual(list(AssignmentArchive.objects.values_list('day', 'count')), [(datetime.date(2024, 7, 1), 3)])
+        self.assertTrue(TechAssignment.objects.filter(is_current=True).exists())
+
+    def test_overlapping_archives_move_rows_once(self):
+        for day in range(1, 6):
+            TechAssignment.objects.create(tech=self.tech1, assigned_at=self.local(2024, 7, day, 8), is_current=False)
+        # Both archivers were handed the same rows, as two overlapping advances would be
+        old_rows = TechAssignment.objects.filter(assigned_at__lt=self.local(2024, 7, 4))
+        first = TechAssignment.objects.filter(pk__in=list(old_rows.values_list('pk', flat=True)))
+        second = TechAssignment.objects.filter(pk__in=list(old_rows.values_list('pk', flat=True)))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(AssignmentArchive.archive(first), 3)
+        self.assertEqual(AssignmentArchive.archive(second), 0)
+        self.assertEqual(TechAssignment.objects.count() + sum(AssignmentArchive.objects.values_list('count', flat=True)), 5)
+
+        # The rows are only read once the write lock is held
+        statements = [query['sql'].split()[0] for query in queries.captured_queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(statements[:2], ['UPDATE', 'SELECT'])
+
+    def test_deleting_tech_drops_its_archived_entries(self):
+        TechAssignment.objects.create(tech=self.tech1, assigned_at=self.local(2024, 7, 1, 8), is_current=False)
+        TechAssignment.objects.create(tech=self.tech2, assigned_at=self.local(2024, 7, 1, 9), is_current=False)
+        TechAssignment.objects.create(tech=self.tech1, assigned_at=self.local(2024, 7, 2, 8), is_current=False)
+        TechAssignment.objects.create(tech=self.tech2, assigned_at=self.local(2024, 7, 3, 8), is_current=True)
+        TechAssignment.prune_history(keep=1)
+
+        self.tech1.delete()
+        self.assertEqual(list(AssignmentArchive.objects.values_list('day', 'count')), [(datetime.date(2024, 7, 1), 1)])
+        response = self.client.get(reverse('export_assignments'), {'format': 'ndjson'})
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([record['tech_name'] for record in records], ['Bob', 'Bob'])
+
+    def test_deleting_tech_only_rewrites_its_days(self):
+        for day in range(1, 6):
+            TechAssignment.objects.create(tech=self.tech2, assigned_at=self.local(2024, 7, day, 8), is_current=False)
+        TechAssignment.objects.create(tech=self.tech1, assigned_at=self.local(2024, 7, 3, 9), is_current=False)
+        TechAssignment.objects.create(tech=self.tech2, assigned_at=self.local(2024, 7, 6, 8), is_current=True)
+        TechAssignment.prune_history(keep=1)
+        self.assertEqual(ArchivedTechDay.objects.filter(tech=self.tech1).count(), 1)
+
+        tech1_id = self.tech1.pk
+        get_entries = AssignmentArchive.get_entries
+        with patch.object(AssignmentArchive, 'get_entries', autospec=True, side_effect=get_entries) as decoded:
+            self.tech1.delete()
+        self.assertEqual([call.args[0].day for call in decoded.call_args_list], [datetime.date(2024, 7, 3)])
+        self.assertEqual(sum(AssignmentArchive.objects.values_list('count', flat=True)), 5)
+        self.assertFalse(ArchivedTechDay.objects.filter(tech_id=tech1_id).exists())
+
+    def test_export_merges_archive_and_hot_rows(self):
+        TechAssignment.objects.create(tech=self.tech1, assigned_at=self.local(2024, 7, 1, 8), is_current=False)
+        TechAssignment.objects.create(tech=self.tech2, assigned_at=self.local(2024, 7, 2, 8), is_current=False)
+        TechAssignment.objects.create(tech=self.tech1, assigned_at=self.local(2024, 7, 3, 8), is_current=True)
+        TechAssignment.prune_history(keep=2)
+
+        response = self.client.get(reverse('export_assignments'), {'format': 'ndjson'})
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([record['tech_name'] for record in records], ['Alice', 'Bob', 'Alice'])
+        self.assertEqual(records[0]['assigned_at'], self.local(2024, 7, 1, 8).isoformat())
+
+        response = self.client.get(reverse('export_assignments'), {'format': 'ndjson', 'end': '2024-07-01'})
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 1)
+
+class RotationStateViewTests(TestCase):
+    def setUp(self):
+        self.tech1 = Tech.objects.create(name="Alice", active=True)
+        self.tech2 = Tech.objects.create(name="Bob", active=True)
+        self.tech3 = Tech.objects.create(name="Carol", active=True)
+        self.settings = Settings.load()
+
+    def post_state(self, name):
+        response = self.client.post(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        # The page updates in place, so nothing may be left queued for the next render
+        self.assertNotIn('messages', response.cookies)
+        return response.json()
+
+    def assertMatchesMainView(self, state):
+        context = self.client.get(reverse('main')).context
+        for key in ('current_tech', 'previous_tech', 'next_tech'):
+            tech = context[key]
+            self.assertEqual(state[key], {'id': tech.id, 'name': tech.name} if tech else None)
+        self.assertEqual(state['viewing_history'], context['viewing_history'])
+
+    def test_next_state(self):
+        state = self.post_state('next_tech_state')
+        self.assertEqual(state['current_tech']['name'], 'Alice')
+        self.assertEqual(state['level'], 'success')
+        assignment = TechAssignment.objects.get(is_current=True)
+        self.assertEqual(state['new_assignment']['id'], assignment.id)
+        self.assertEqual(state['current_assignment_id'], assignment.id)
+        self.assertMatchesMainView(state)
+
+        state = self.post_state('next_tech_state')
+        self.assertEqual([state['previous_tech']['name'], state['current_tech']['name'], state['next_tech']['name']],
+                         ['Alice', 'Bob', 'Carol'])
+        self.assertMatchesMainView(state)
+
+    def test_previous_and_return_to_current_state(self):
+        TechAssignment.objects.create(tech=self.tech1, assigned_at=timezone.now() - timezone.timedelta(days=2), is_current=False)
+        TechAssignment.objects.create(tech=self.tech2, assigned_at=timezone.now() - timezone.timedelta(days=1), is_current=False)
+        self.settings.update_current_tech(self.tech3, direction='forward')
+
+        state = self.post_state('previous_tech_state')
+        self.assertTrue(state['viewing_history'])
+        self.assertIsNone(state['message'])
+        self.assertIsNone(state['new_assignment'])
+        self.assertEqual([state['previous_tech']['name'], state['current_tech']['name'], state['next_tech']['name']],
+                         ['Alice', 'Bob', 'Carol'])
+        self.assertMatchesMainView(state)
+
+        state = self.post_state('next_tech_state')
+        self.assertFalse(state['viewing_history'])
+        self.assertEqual(state['message'], 'Returned to current tech: Carol')
+        self.assertIsNone(state['new_assignment'])
+        self.assertMatchesMainView(state)
+
+    def test_previous_state_at_beginning(self):
+        self.settings.update_current_tech(self.tech1, direction='forward')
+        state = self.post_state('previous_tech_state')
+        self.assertEqual(state['level'], 'info')
+        self.assertEqual(state['current_tech']['name'], 'Alice')
+        self.assertMatchesMainView(state)
+
+    def test_next_state_without_techs(self):
+        Tech.objects.all().delete()
+        state = self.post_state('next_tech_state')
+        self.assertEqual(state['level'], 'warning')
+        self.assertIsNone(state['current_tech'])
+        self.assertIsNone(state['next_tech'])
+
+    def test_transitions_are_decided_under_the_write_lock(self):
+        self.settings.update_current_tech(self.tech1, direction='forward')
+        for name in ('next_tech_state', 'previous_tech_state'):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(reverse(name))
+            statements = [query['sql'] for query in queries.captured_queries if 'SAVEPOINT' not in query['sql']]
+            self.assertTrue(statements[0].startswith('UPDATE "Rotation_settings"'), statements[0])
+
+    def test_state_requires_post(self):
+        self.assertEqual(self.client.get(reverse('next_tech_state')).status_code, 405)
+        self.assertFalse(TechAssignment.objects.exists())
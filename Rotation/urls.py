@@ -5,9 +5,15 @@ urlpatterns = [
     path('', views.main_view, name='main'),
     path('next/', views.next_tech, name='next_tech'),
     path('previous/', views.previous_tech, name='previous_tech'),
+    path('next/state/', views.next_tech_state, name='next_tech_state'),
+    path('previous/state/', views.previous_tech_state, name='previous_tech_state'),
+    path('history/export/', views.export_assignments, name='export_assignments'),
     path('techs/', views.tech_list, name='tech_list'),
+    path('techs/search/', views.tech_search, name='tech_search'),
     path('techs/create/', views.tech_create, name='tech_create'),
     path('techs/<int:pk>/update/', views.tech_update, name='tech_update'),
     path('techs/<int:pk>/delete/', views.tech_delete, name='tech_delete'),
+    path('techs/<int:pk>/unavailability/', views.tech_unavailability, name='tech_unavailability'),
+    path('unavailability/<int:pk>/delete/', views.unavailability_delete, name='unavailability_delete'),
     path('settings/', views.settings_view, name='settings'),
 ]
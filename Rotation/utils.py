@@ -1,12 +1,39 @@
 import json
+import os
+import sqlite3
+import tempfile
 from django.conf import settings
 from pathlib import Path
 from django.db import connections
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 CONFIG_FILE = BASE_DIR / 'config.json'
+DATABASE_LOCATION_ENV = 'NEXTECH_DATABASE_LOCATION'
+
+# Alias of the read-only connection to the same SQLite file (see routers.py).
+READONLY_DATABASE = 'readonly'
+
+# Pages copied per backup step; between steps the source lock is released
+# so writers are only ever held up for one step at a time.
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.005
+# SQLite restarts a backup whenever another connection writes to the source.
+# After this many restarts the copy is taken in a single step instead.
+BACKUP_MAX_RESTARTS = 5
+# Copies verified without the write lock before falling back to copying under it.
+BACKUP_VERIFY_ATTEMPTS = 3
+
+class DatabaseRelocationError(Exception):
+    pass
+
+class _BackupRestartLimit(Exception):
+    pass
 
 def get_database_location():
+    # Lets a process (e.g. the loadtest server) run against another file
+    # without touching the shared config.json.
+    if os.environ.get(DATABASE_LOCATION_ENV):
+        return os.environ[DATABASE_LOCATION_ENV]
     try:
         with open(CONFIG_FILE, 'r') as f:
             config = json.load(f)
@@ -14,6 +41,53 @@ def get_database_location():
     except FileNotFoundError:
         return 'db.sqlite3'  # Default value if file doesn't exist
 
+def get_database_path(location=None):
+    if location is None:
+        location = get_database_location()
+    return str(settings.BASE_DIR / location)
+
+def get_readonly_database_name(path):
+    """SQLite URI opening ``path`` read-only; Django's sqlite backend always passes uri=True."""
+    return Path(path).as_uri() + '?mode=ro'
+
+def point_connections_at(path):
+    """Update the settings of every alias backed by the database file."""
+    names = {'default': str(path), READONLY_DATABASE: get_readonly_database_name(path)}
+    for alias, name in names.items():
+        if alias in connections.databases:
+            connections.databases[alias]['NAME'] = name
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        if connection.alias == READONLY_DATABASE:
+            cursor.execute('PRAGMA query_only = 1')
+        else:
+            # WAL lets the read-only connections keep reading while a writer commits.
+            cursor.execute('PRAGMA journal_mode = WAL')
+
+def write_database_location(new_location):
+    """Rewrite config.json via a temp file + os.replace so readers never see a partial file."""
+    try:
+        with open(CONFIG_FILE, 'r') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        config = {}
+    config['database_location'] = new_location
+
+    fd, tmp_path = tempfile.mkstemp(dir=CONFIG_FILE.parent, prefix='.config.', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(config, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, CONFIG_FILE)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def update_database_location(new_location):
     print("Updating database location")
     current_location = get_database_location()
@@ -21,16 +95,186 @@ def update_database_location(new_location):
         return True
 
     try:
-        with open(CONFIG_FILE, 'r+') as f:
-            config = json.load(f)
-            config['database_location'] = new_location
-            f.seek(0)
-            json.dump(config, f, indent=4)
-            f.truncate()
-        
+        write_database_location(new_location)
+
         # Update the database configuration
-        connections.databases['default']['NAME'] = str(settings.BASE_DIR / new_location)
+        point_connections_at(get_database_path(new_location))
         return True
     except Exception as e:
         print(f"Error updating config file: {e}")
         return False
+
+def sync_database_connection(**kwargs):
+    """Point the default connection at the location in config.json.
+
+    Connected to ``request_started`` so every worker picks up a relocation
+    before its next request opens a connection.
+    """
+    path = get_database_path()
+    connection = connections['default']
+    if str(connection.settings_dict['NAME']) != path:
+        for alias in ('default', READONLY_DATABASE):
+            if alias in connections.databases:
+                connections[alias].close()
+        point_connections_at(path)
+
+def _data_version(conn):
+    return conn.execute('PRAGMA data_version').fetchone()[0]
+
+def _tables(conn):
+    return sorted(row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ))
+
+def verify_database_copy(source, target):
+    """Raise DatabaseRelocationError unless ``target`` is a sound copy of ``source``."""
+    check = [row[0] for row in target.execute('PRAGMA integrity_check')]
+    if check != ['ok']:
+        raise DatabaseRelocationError(f"Integrity check failed on copy: {'; '.join(check)}")
+
+    source_tables = _tables(source)
+    if _tables(target) != source_tables:
+        raise DatabaseRelocationError('Copied database does not contain the same tables as the source.')
+
+    for table in source_tables:
+        query = f'SELECT COUNT(*) FROM "{table}"'
+        if source.execute(query).fetchone() != target.execute(query).fetchone():
+            raise DatabaseRelocationError(f'Row count mismatch in table {table}.')
+
+def _copy_database(source, target, pages, progress):
+    """Back up ``source`` into ``target``; return the source data_version it covers.
+
+    The version is read before the copy starts, so the copy holds at least
+    everything committed up to it.
+    """
+    state = {'remaining': None, 'restarts': 0}
+
+    def step(status, remaining, total):
+        if state['remaining'] is not None and remaining >= state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > BACKUP_MAX_RESTARTS:
+                raise _BackupRestartLimit()
+        state['remaining'] = remaining
+        if progress:
+            progress(status, remaining, total)
+
+    version = _data_version(source)
+    try:
+        source.backup(target, pages=pages, progress=step, sleep=BACKUP_STEP_SLEEP)
+    except _BackupRestartLimit:
+        # Writers keep invalidating the copy; take it in one step instead,
+        # from a single read snapshot.
+        version = _data_version(source)
+        source.backup(target, pages=-1, progress=progress)
+    return version
+
+def _verify_unchanged_copy(source, target, version):
+    """verify_database_copy(), but False if the source has been written to
+    since ``version`` (the copy may then be behind).
+
+    No transaction is held across the checks, so writers are not held up in
+    either journal mode; an unchanged data_version afterwards means the
+    source did not change while they ran.
+    """
+    try:
+        verify_database_copy(source, target)
+    except DatabaseRelocationError:
+        if _data_version(source) != version:
+            return False
+        raise
+    return _data_version(source) == version
+
+def backup_database(source_path, target_path, pages=BACKUP_PAGES_PER_STEP, progress=None, overwrite=False, lock_source=False):
+    """Copy a live SQLite database with the online backup API.
+
+    The copy runs ``pages`` pages per step and is verified (integrity check,
+    tables, row counts) without any lock held, retrying if a write lands in
+    the meantime. Only then is the source write lock taken, just long enough
+    to re-check ``PRAGMA data_version`` and, if something was committed since
+    the verified copy, copy it again. With ``lock_source`` the lock is kept
+    and the connection holding it is returned so the caller can switch over
+    before any further write lands; otherwise ``None`` is returned.
+    """
+    source_path = str(source_path)
+    target_path = str(target_path)
+    if os.path.abspath(source_path) == os.path.abspath(target_path):
+        raise DatabaseRelocationError('Source and target database are the same file.')
+    if not os.path.exists(source_path):
+        raise DatabaseRelocationError(f'Source database {source_path} does not exist.')
+    if os.path.exists(target_path) and not overwrite:
+        raise DatabaseRelocationError(f'Target database {target_path} already exists.')
+
+    target_dir = os.path.dirname(os.path.abspath(target_path))
+    os.makedirs(target_dir, exist_ok=True)
+
+    # Build the copy next to the target and rename it into place once verified.
+    fd, partial_path = tempfile.mkstemp(dir=target_dir, suffix='.partial')
+    os.close(fd)
+
+    source = sqlite3.connect(source_path, isolation_level=None)
+    target = sqlite3.connect(partial_path, isolation_level=None)
+    # Separate connection for the write lock: a connection holding a write
+    # transaction cannot itself be the source of a backup.
+    lock = sqlite3.connect(source_path, isolation_level=None, timeout=30)
+
+    try:
+        for attempt in range(BACKUP_VERIFY_ATTEMPTS):
+            version = _copy_database(source, target, pages, progress)
+            if _verify_unchanged_copy(source, target, version):
+                break
+        else:
+            # Never got a copy that was still current once verified.
+            version = None
+
+        lock.execute('BEGIN IMMEDIATE')
+        if version is None or _data_version(source) != version:
+            # Writes landed after the verified copy: copy again under the lock.
+            # Same backup path as the verified copies, so only the table list
+            # is re-checked here to keep the lock short.
+            source.backup(target, pages=-1, progress=progress)
+            if _tables(target) != _tables(source):
+                raise DatabaseRelocationError('Copied database does not contain the same tables as the source.')
+
+        target.close()
+        source.close()
+        os.replace(partial_path, target_path)
+    except (sqlite3.Error, OSError, DatabaseRelocationError) as e:
+        target.close()
+        source.close()
+        if lock.in_transaction:
+            lock.execute('ROLLBACK')
+        lock.close()
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        if isinstance(e, DatabaseRelocationError):
+            raise
+        raise DatabaseRelocationError(str(e)) from e
+
+    if lock_source:
+        return lock
+    lock.execute('ROLLBACK')
+    lock.close()
+    return None
+
+def relocate_database(new_location, pages=BACKUP_PAGES_PER_STEP, progress=None, overwrite=False):
+    """Copy the live database to ``new_location`` and switch every worker to it.
+
+    The source write lock is held from the final data_version check until
+    config.json has been swapped, so every write committed before the switch
+    is in the copy. Workers move over on their next request via
+    ``sync_database_connection``. A request that already has a connection to
+    the old file (e.g. one waiting on its lock during the switch) still
+    commits there, and that write is not in the new database.
+    """
+    source_path = get_database_path()
+    target_path = get_database_path(new_location)
+
+    connections.close_all()
+    lock = backup_database(source_path, target_path, pages=pages, progress=progress,
+                           overwrite=overwrite, lock_source=True)
+    try:
+        write_database_location(new_location)
+        point_connections_at(target_path)
+    finally:
+        lock.execute('ROLLBACK')
+        lock.close()
@@ -1,16 +1,28 @@
 import sys
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.contrib import messages
-from django.db import connections
-from .models import Tech, TechAssignment, Settings
-from .forms import TechForm, SettingsForm
-from .utils import get_database_location, update_database_location
-from .constants import ASSIGNMENT_HISTORY_LIMIT
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+from django.db import connections, transaction
+from .models import Tech, TechAssignment, Settings, Unavailability
+from .forms import TechForm, SettingsForm, AssignmentExportForm, UnavailabilityForm
+from .exports import iter_assignment_rows, stream_csv, stream_ndjson
+from .utils import get_database_location, update_database_location, relocate_database, DatabaseRelocationError
+from .constants import ASSIGNMENT_HISTORY_LIMIT, SEARCH_RESULT_LIMIT
+from .roster import roster_page
+from .routers import primary_db
+from .templatetags.custom_filters import custom_date
 
 def tech_list(request):
-    techs = Tech.objects.all()
-    return render(request, 'rotation/tech_list.html', {'techs': techs})
+    return render(request, 'rotation/tech_list.html', {'roster': roster_page(request.GET)})
 
+def tech_search(request):
+    query = request.GET.get('q', '')
+    techs = Tech.search(query).values('id', 'name', 'active')[:SEARCH_RESULT_LIMIT]
+    return JsonResponse({'results': list(techs)})
+
+@primary_db
 def tech_create(request):
     if request.method == 'POST':
         form = TechForm(request.POST)
@@ -21,6 +33,7 @@ def tech_create(request):
         form = TechForm()
     return render(request, 'rotation/tech_form.html', {'form': form})
 
+@primary_db
 def tech_update(request, pk):
     tech = get_object_or_404(Tech, pk=pk)
     if request.method == 'POST':
@@ -32,6 +45,7 @@ def tech_update(request, pk):
         form = TechForm(instance=tech)
     return render(request, 'rotation/tech_form.html', {'form': form})
 
+@primary_db
 def tech_delete(request, pk):
     tech = get_object_or_404(Tech, pk=pk)
     if request.method == 'POST':
@@ -39,11 +53,36 @@ def tech_delete(request, pk):
         return redirect('tech_list')
     return render(request, 'rotation/tech_confirm_delete.html', {'tech': tech})
 
-def main_view(request):
-    settings = Settings.load()
-    techs = Tech.objects.all()
-    assignments = TechAssignment.objects.all()[:ASSIGNMENT_HISTORY_LIMIT]
-    
+@primary_db
+def tech_unavailability(request, pk):
+    tech = get_object_or_404(Tech, pk=pk)
+    if request.method == 'POST':
+        form = UnavailabilityForm(request.POST)
+        if form.is_valid():
+            unavailability = form.save(commit=False)
+            unavailability.tech = tech
+            unavailability.save()
+            messages.success(request, f"{tech.name} marked unavailable from {unavailability.start_date} to {unavailability.end_date}.")
+            return redirect('tech_unavailability', pk=tech.pk)
+    else:
+        form = UnavailabilityForm()
+    unavailabilities = tech.unavailabilities.filter(end_date__gte=timezone.localdate())
+    return render(request, 'rotation/tech_unavailability.html', {
+        'tech': tech,
+        'form': form,
+        'unavailabilities': unavailabilities,
+    })
+
+@primary_db
+def unavailability_delete(request, pk):
+    unavailability = get_object_or_404(Unavailability, pk=pk)
+    if request.method == 'POST':
+        unavailability.delete()
+        messages.success(request, "Unavailability removed.")
+    return redirect('tech_unavailability', pk=unavailability.tech_id)
+
+def rotation_state():
+    """Previous/current/next techs as shown on the main page, from scratch."""
     # Get the most recent assignment
     most_recent_assignment = TechAssignment.objects.order_by('-assigned_at').first()
     
@@ -71,81 +110,200 @@ def main_view(request):
     else:
         previous_tech = None
         current_tech = None
-        next_tech = techs.filter(active=True).first()
+        next_tech = Tech.get_first()
 
     # Determine if we're viewing history
     viewing_history = current_assignment != most_recent_assignment if current_assignment and most_recent_assignment else False
     
+    return {
+        'current_tech': current_tech,
+        'previous_tech': previous_tech,
+        'next_tech': next_tech,
+        'viewing_history': viewing_history,
+        'current_assignment': current_assignment,
+        'new_assignment': None,
+    }
+
+def main_view(request):
+    settings = Settings.load()
+    assignments = TechAssignment.objects.all()[:ASSIGNMENT_HISTORY_LIMIT]
+    state = rotation_state()
+    current_tech, next_tech = state['current_tech'], state['next_tech']
+    
     return render(request, 'rotation/main.html', {
         'settings': settings,
         'current_tech': current_tech,
-        'previous_tech': previous_tech,
+        'previous_tech': state['previous_tech'],
         'next_tech': next_tech,
-        'techs': techs,
+        'roster': roster_page(
+            request.GET,
+            current_tech_id=current_tech.id if current_tech else None,
+            next_tech_id=next_tech.id if next_tech else None,
+        ),
         'assignments': assignments,
-        'viewing_history': viewing_history,
+        'history_limit': ASSIGNMENT_HISTORY_LIMIT,
+        'viewing_history': state['viewing_history'],
     })
 
-def next_tech(request):
-    settings = Settings.load()
-    techs = Tech.objects.filter(active=True)
+def export_assignments(request):
+    form = AssignmentExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text(), content_type='text/plain')
+
+    start, end = form.cleaned_data['start'], form.cleaned_data['end']
+    export_format = form.cleaned_data['format'] or 'csv'
+    rows = iter_assignment_rows(start, end)
+    if export_format == 'ndjson':
+        response = StreamingHttpResponse(stream_ndjson(rows), content_type='application/x-ndjson')
+    else:
+        response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+
+    filename = 'assignments_{}_{}.{}'.format(start or 'start', end or 'end', export_format)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def advance_rotation():
+    """Move to the next tech (or back to the present when viewing history).
+
+    Returns ``(level, message, state)``; ``state`` is the new main-page state
+    built from what the transition already loaded, or None if nothing moved.
+    """
+    with transaction.atomic():
+        # Decide under the write lock, so overlapping clicks advance one at a time
+        Settings.lock()
+        settings = Settings.load()
+        techs = Tech.objects.filter(active=True)
     
-    # Get the most recent assignment
-    most_recent_assignment = TechAssignment.objects.order_by('-assigned_at').first()
+        # Get the most recent assignment
+        most_recent_assignment = TechAssignment.objects.select_related('tech').order_by('-assigned_at').first()
     
-    # Get the current assignment (which might be historical)
-    current_assignment = TechAssignment.objects.filter(is_current=True).first()
+        # Get the current assignment (which might be historical)
+        current_assignment = TechAssignment.objects.select_related('tech').filter(is_current=True).first()
 
-    if not current_assignment and techs.exists():
-        # If no tech is currently assigned, assign the first active tech
-        next_tech = techs.first()
-    elif current_assignment != most_recent_assignment:
-        # We're viewing history, so reset to the most recent assignment
-        next_tech = most_recent_assignment.tech
-    elif current_assignment:
-        # We're at the most recent assignment, so get the next tech in rotation
-        next_tech = current_assignment.tech.get_next()
-    else:
-        next_tech = None
+        if not current_assignment and techs.exists():
+            # If no tech is currently assigned, assign the first available active tech
+            next_tech = Tech.get_first()
+        elif current_assignment != most_recent_assignment:
+            # We're viewing history, so reset to the most recent assignment
+            next_tech = most_recent_assignment.tech
+        elif current_assignment:
+            # We're at the most recent assignment, so get the next tech in rotation
+            next_tech = current_assignment.tech.get_next()
+        else:
+            next_tech = None
+
+        if not next_tech:
+            return messages.WARNING, "No active techs available to assign.", None
 
-    if next_tech:
         if current_assignment != most_recent_assignment:
             # If we were viewing history, update without creating a new assignment
             TechAssignment.objects.filter(is_current=True).update(is_current=False)
             most_recent_assignment.is_current = True
             most_recent_assignment.save()
-            settings.current_tech = next_tech
-            settings.previous_tech = TechAssignment.objects.filter(
-                assigned_at__lt=most_recent_assignment.assigned_at
-            ).order_by('-assigned_at').first().tech if TechAssignment.objects.filter(
+            earlier_assignment = TechAssignment.objects.select_related('tech').filter(
                 assigned_at__lt=most_recent_assignment.assigned_at
-            ).exists() else None
+            ).order_by('-assigned_at').first()
+            settings.current_tech = next_tech
+            settings.previous_tech = earlier_assignment.tech if earlier_assignment else None
             settings.save()
-            messages.success(request, f"Returned to current tech: {next_tech.name}")
-        else:
-            # Normal forward progression
-            settings.update_current_tech(next_tech, direction='forward')
-            messages.success(request, f"{next_tech.name} has been assigned as the next tech.")
-    else:
-        messages.warning(request, "No active techs available to assign.")
+            state = {
+                'current_tech': next_tech,
+                'previous_tech': settings.previous_tech,
+                'next_tech': next_tech.get_next(),
+                'viewing_history': False,
+                'current_assignment': most_recent_assignment,
+                'new_assignment': None,
+            }
+            return messages.SUCCESS, f"Returned to current tech: {next_tech.name}", state
 
-    return redirect('main')
+        # Normal forward progression
+        assignment = settings.update_current_tech(next_tech, direction='forward')
+        state = None
+        if assignment:
+            state = {
+                'current_tech': next_tech,
+                'previous_tech': current_assignment.tech if current_assignment else None,
+                'next_tech': next_tech.get_next(),
+                'viewing_history': False,
+                'current_assignment': assignment,
+                'new_assignment': assignment,
+            }
+        return messages.SUCCESS, f"{next_tech.name} has been assigned as the next tech.", state
 
-def previous_tech(request):
-    settings = Settings.load()
-    current_assignment = TechAssignment.objects.filter(is_current=True).first()
-    if current_assignment:
-        previous_assignment = TechAssignment.objects.filter(
+def step_back_rotation():
+    """Move to the previous assignment in history; same return value as advance_rotation()."""
+    with transaction.atomic():
+        Settings.lock()
+        settings = Settings.load()
+        current_assignment = TechAssignment.objects.select_related('tech').filter(is_current=True).first()
+        if not current_assignment:
+            return messages.INFO, "No tech assignments found.", None
+
+        previous_assignment = TechAssignment.objects.select_related('tech').filter(
             assigned_at__lt=current_assignment.assigned_at
         ).order_by('-assigned_at').first()
-        if previous_assignment:
-            settings.update_current_tech(None, direction='backward')
-        else:
-            messages.info(request, "You're at the beginning of the tech history.")
-    else:
-        messages.info(request, "No tech assignments found.")
+        if not previous_assignment:
+            return messages.INFO, "You're at the beginning of the tech history.", None
+
+        settings.update_current_tech(None, direction='backward')
+        earlier_assignment = TechAssignment.objects.select_related('tech').filter(
+            assigned_at__lt=previous_assignment.assigned_at
+        ).order_by('-assigned_at').first()
+        state = {
+            'current_tech': previous_assignment.tech,
+            'previous_tech': earlier_assignment.tech if earlier_assignment else None,
+            'next_tech': current_assignment.tech,
+            'viewing_history': True,
+            'current_assignment': previous_assignment,
+            'new_assignment': None,
+        }
+        return None, None, state
+
+def state_json(level, message, state):
+    def tech_json(tech):
+        return {'id': tech.id, 'name': tech.name} if tech else None
+
+    new_assignment = state['new_assignment']
+    return {
+        'level': messages.DEFAULT_TAGS.get(level),
+        'message': message,
+        'current_tech': tech_json(state['current_tech']),
+        'previous_tech': tech_json(state['previous_tech']),
+        'next_tech': tech_json(state['next_tech']),
+        'viewing_history': state['viewing_history'],
+        'current_assignment_id': state['current_assignment'].id if state['current_assignment'] else None,
+        'new_assignment': {
+            'id': new_assignment.id,
+            'tech_name': new_assignment.tech.name,
+            'assigned_at': custom_date(new_assignment.assigned_at, "F j, Y g:i A"),
+        } if new_assignment else None,
+    }
+
+@primary_db
+def next_tech(request):
+    level, message, state = advance_rotation()
+    messages.add_message(request, level, message)
     return redirect('main')
 
+@primary_db
+def previous_tech(request):
+    level, message, state = step_back_rotation()
+    if message:
+        messages.add_message(request, level, message)
+    return redirect('main')
+
+@require_POST
+@primary_db
+def next_tech_state(request):
+    level, message, state = advance_rotation()
+    return JsonResponse(state_json(level, message, state or rotation_state()))
+
+@require_POST
+@primary_db
+def previous_tech_state(request):
+    level, message, state = step_back_rotation()
+    return JsonResponse(state_json(level, message, state or rotation_state()))
+
 def settings_view(request):
     # Check if the code is running in a test environment
     is_testing = 'test' in sys.argv or 'test_coverage' in sys.argv
@@ -158,7 +316,14 @@ def settings_view(request):
             new_location = form.cleaned_data['database_location']
             if new_location != current_location and not is_testing:
                 # Only attempt to update database location if not in a test environment
-                if update_database_location(new_location):
+                if form.cleaned_data['copy_data']:
+                    try:
+                        relocate_database(new_location)
+                        messages.success(request, 'Database copied and verified. All workers will use the new location on their next request.')
+                        return redirect('settings')
+                    except DatabaseRelocationError as e:
+                        messages.error(request, f'Failed to relocate database: {e}')
+                elif update_database_location(new_location):
                     connections.close_all()
                     messages.success(request, 'Database location updated successfully. The change will take effect immediately.')
                     return redirect('settings')